@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Backfill next_scan_due_at on channel_scans documents.
+
+The discovery planner finds channels in scan cooldown with a range query on
+next_scan_due_at. Scans written before that field existed only carry
+last_scanned_at, so without this backfill they would look due right away.
+
+This script:
+1. Streams all channel_scans documents
+2. Skips documents that already have next_scan_due_at
+3. Sets next_scan_due_at = last_scanned_at + rescan interval on the rest
+
+Usage:
+    FIRESTORE_EMULATOR_HOST=localhost:8200 GCP_PROJECT_ID=copycat-local uv run python3 scripts/backfill-channel-scan-due.py
+
+    # Production:
+    GCP_PROJECT_ID=copycat-429012 FIRESTORE_DATABASE_ID=copycat uv run python3 scripts/backfill-channel-scan-due.py
+"""
+
+import os
+from datetime import timedelta
+
+from google.cloud import firestore
+
+# Must match CHANNEL_RESCAN_INTERVAL in services/discovery-service/app/core/search_randomizer.py
+CHANNEL_RESCAN_INTERVAL = timedelta(days=7)
+
+# Firestore allows 500 writes per batch
+BATCH_SIZE = 400
+
+
+def main():
+    project_id = os.getenv("GCP_PROJECT_ID")
+    database_id = os.getenv("FIRESTORE_DATABASE_ID", "(default)")
+    db = firestore.Client(project=project_id, database=database_id)
+
+    print("🔧 Backfilling next_scan_due_at on channel scans...")
+    print()
+
+    batch = db.batch()
+    pending = 0
+    updated = 0
+    skipped = 0
+
+    for doc in db.collection("channel_scans").select(["last_scanned_at", "next_scan_due_at"]).stream():
+        data = doc.to_dict()
+        last_scanned_at = data.get("last_scanned_at")
+
+        if data.get("next_scan_due_at") or not last_scanned_at:
+            skipped += 1
+            continue
+
+        batch.update(doc.reference, {"next_scan_due_at": last_scanned_at + CHANNEL_RESCAN_INTERVAL})
+        pending += 1
+        updated += 1
+
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+
+    print(f"✅ Updated {updated} channel scans ({skipped} already had the field or no scan time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,23 +40,28 @@ class ChannelTracker:
             # Use channel_id as document ID
             doc_ref = self.firestore.collection("channels").document(channel_id)
             doc = doc_ref.get()
+            now = datetime.now(UTC)
 
             if doc.exists:
-                # Channel exists, update last_seen and increment video count
-                doc_ref.update({
-                    "channel_title": channel_title,  # Update title in case it changed
-                    "last_seen_at": datetime.now(UTC),
+                # Channel exists, increment video count and write only changed fields
+                data = doc.to_dict()
+                update_fields = {
                     "video_count": Increment(1),  # Increment video count!
-                })
+                    "last_seen_at": now,
+                }
+                if data.get("channel_title") != channel_title:
+                    update_fields["channel_title"] = channel_title  # Title changed
+
+                doc_ref.update(update_fields)
                 logger.debug(f"Updated channel: {channel_id} (video_count++)")
-                return doc.to_dict()
+                return data
             else:
                 # Create new channel with initial count of 1
                 channel_data = {
                     "channel_id": channel_id,
                     "channel_title": channel_title,
-                    "discovered_at": datetime.now(UTC),
-                    "last_seen_at": datetime.now(UTC),
+                    "discovered_at": now,
+                    "last_seen_at": now,
                     "video_count": 1,  # First video!
                     "channel_risk": 40,  # Default risk for unknown channels (updated by risk-analyzer after scans)
                     "infringing_videos_count": 0,
@@ -20,8 +20,8 @@ from datetime import datetime, UTC
 
 from ..models import DiscoveryStats
 from .quota_manager import QuotaManager
-from .search_randomizer import SearchRandomizer, SearchOrder
-from .video_processor import VideoProcessor
+from .search_randomizer import CHANNEL_RESCAN_INTERVAL, SearchRandomizer, SearchOrder
+from .video_processor import VIDEO_MESSAGE_ADAPTER, VideoProcessor
 from .youtube_client import YouTubeClient
 from .search_history import SearchHistory
 from app.utils.logging_utils import log_exception_json
@@ -144,201 +144,207 @@ class DiscoveryEngine:
         keywords_to_search = unique_keywords
         logger.info(f"🚀 Starting to process {len(keywords_to_search)} keywords (NO COOLDOWN) × various orderings...")
 
-        for idx, params in enumerate(search_plan, 1):
-            # Create unique key for this keyword+order combination
-            query_key = f"{params.query}|{params.order.value}"
-
-            # Skip if we already processed this keyword+order in this run
-            if query_key in queries_processed:
-                logger.debug(f"⏭️  Skipping '{params.query}' order={params.order.value} (already processed)")
-                continue
-
-            # Check search history to avoid duplicate searches
-            logger.debug(f"Search history check: self.search_history={self.search_history is not None}, is_channel={params.query.startswith('CHANNEL:')}")
-            if self.search_history and not params.query.startswith("CHANNEL:"):
-                logger.info(f"🔍 Checking search history for '{params.query}' order={params.order.value}")
-                should_search, time_window = await self.search_history.should_search(
-                    keyword=params.query,
-                    order=params.order.value
-                )
+        try:
+            for idx, params in enumerate(search_plan, 1):
+                # Create unique key for this keyword+order combination
+                query_key = f"{params.query}|{params.order.value}"
 
-                if not should_search:
-                    logger.info(f"⏭️  SKIP: '{params.query}' order={params.order.value} - searched too recently")
+                # Skip if we already processed this keyword+order in this run
+                if query_key in queries_processed:
+                    logger.debug(f"⏭️  Skipping '{params.query}' order={params.order.value} (already processed)")
                     continue
 
-                # Apply intelligent time window if suggested
-                if time_window:
-                    logger.info(f"🎯 Applying time window: {time_window['published_after'][:10]} to {time_window['published_before'][:10]}")
-                    params.published_after = time_window['published_after']
-                    params.published_before = time_window['published_before']
-
-            logger.info(f"\n{'='*80}")
-            logger.info(f"🔍 QUERY {idx}/{len(search_plan)}: '{params.query}' order={params.order.value}")
-
-            # Send query start to callback
-            if progress_callback:
-                await progress_callback({
-                    'type': 'query_start',
-                    'query_index': idx,
-                    'total_queries': len(search_plan),
-                    'keyword': params.query,
-                    'order': params.order.value,
-                    'quota_used': quota_used,
-                    'max_quota': max_quota
-                })
-
-            # Check if we've already exhausted quota (check AFTER last call, not before)
-            if quota_used >= max_quota:
-                logger.info(f"💯 Quota fully exhausted ({quota_used}/{max_quota})")
-                break
-
-            if not self.quota.can_afford("search", 1):
-                logger.info("Global quota exhausted")
-                break
-
-            try:
-                # Check if this is a channel scan
-                is_channel_scan = params.query.startswith("CHANNEL:")
-
-                if is_channel_scan:
-                    # Extract channel ID
-                    channel_id = params.query.replace("CHANNEL:", "")
-                    logger.info(
-                        f"📺 Scanning channel: {channel_id} (fetching 50 recent uploads)"
+                # Check search history to avoid duplicate searches
+                logger.debug(f"Search history check: self.search_history={self.search_history is not None}, is_channel={params.query.startswith('CHANNEL:')}")
+                if self.search_history and not params.query.startswith("CHANNEL:"):
+                    logger.info(f"🔍 Checking search history for '{params.query}' order={params.order.value}")
+                    should_search, time_window = await self.search_history.should_search(
+                        keyword=params.query,
+                        order=params.order.value
                     )
 
-                    # Scan channel uploads
-                    results = self.youtube.get_channel_uploads(
-                        channel_id=channel_id,
-                        max_results=50
-                    )
+                    if not should_search:
+                        logger.info(f"⏭️  SKIP: '{params.query}' order={params.order.value} - searched too recently")
+                        continue
 
-                    # Save channel scan to history
-                    self._save_channel_scan(channel_id)
+                    # Apply intelligent time window if suggested
+                    if time_window:
+                        logger.info(f"🎯 Applying time window: {time_window['published_after'][:10]} to {time_window['published_before'][:10]}")
+                        params.published_after = time_window['published_after']
+                        params.published_before = time_window['published_before']
 
-                else:
-                    # Execute keyword search
-                    time_info = "ALL TIME" if not params.published_after else f"{params.published_after[:10]} to {params.published_before[:10]}"
-                    logger.info(
-                        f"Searching: '{params.query}' "
-                        f"(order={params.order.value}, window={time_info}, "
-                        f"fetching 50 results)"
-                    )
+                logger.info(f"\n{'='*80}")
+                logger.info(f"🔍 QUERY {idx}/{len(search_plan)}: '{params.query}' order={params.order.value}")
 
-                    # YouTubeClient handles pagination automatically
-                    # Only pass published_after if it's set (non-empty)
-                    search_kwargs = {
-                        "query": params.query,
-                        "max_results": 50,
-                        "order": params.order.value,
-                    }
-                    if params.published_after:
-                        search_kwargs["published_after"] = params.published_after
-                    if params.published_before:
-                        search_kwargs["published_before"] = params.published_before
-
-                    results = self.youtube.search_videos(**search_kwargs)
-
-                # Count actual API calls made (youtube_client paginates internally)
-                if is_channel_scan:
-                    # Channel scan costs: 1 (channels.list) + 1 (playlistItems.list) = 2 units
-                    search_quota = 2
-                    quota_used += search_quota
-                    self.quota.record_usage("channel_details", 1)  # Use channel_details operation
-                    self.quota.record_usage("playlist_items", 1)  # + playlist_items
-                    logger.info(f"   → Found {len(results)} videos from channel ({search_quota} quota)")
-                else:
-                    # Keyword search costs: 100 units per page
-                    pages_fetched = (len(results) // 50) + (1 if len(results) % 50 else 0)
-                    search_quota = pages_fetched * 100
-                    quota_used += search_quota
-                    self.quota.record_usage("search", pages_fetched)
-                    logger.info(f"   → Found {len(results)} results ({pages_fetched} pages, {search_quota} quota)")
-
-                # Get video details (enrich with statistics)
-                details_batches = 0
-                if results:
-                    video_ids = [
-                        v['id']['videoId'] if isinstance(v.get('id'), dict) else v['id']
-                        for v in results
-                    ]
-                    # Batch video details in groups of 50
-                    details_batches = (len(video_ids) // 50) + (1 if len(video_ids) % 50 else 0)
-                    results = self.youtube.get_video_details(video_ids)
-                    quota_used += details_batches
-                    self.quota.record_usage("video_details", details_batches)
-                    logger.info(f"   → Enriched with video details ({details_batches} batch calls)")
-
-                # Process results FIRST to get accurate counts
-                new_count, rediscovered_count, skipped_count, batch_channels = self._process_results(
-                    results
-                )
-
-                videos_discovered += new_count
-                videos_rediscovered += rediscovered_count
-                videos_skipped += skipped_count
-                unique_channel_ids.update(batch_channels)
-
-                # Send query results to callback with detailed breakdown
+                # Send query start to callback
                 if progress_callback:
-                    callback_data = {
-                        'type': 'query_result',
+                    await progress_callback({
+                        'type': 'query_start',
+                        'query_index': idx,
+                        'total_queries': len(search_plan),
                         'keyword': params.query,
                         'order': params.order.value,
-                        'results_count': len(results),  # Raw YouTube results
-                        'new_count': new_count,  # Actually new
-                        'rediscovered_count': rediscovered_count,  # Already known
-                        'skipped_count': skipped_count,  # Already scanned
-                        'quota_used': search_quota,
-                        'total_quota_used': quota_used
-                    }
-                    # Include time window if present
-                    if params.published_after:
-                        callback_data['time_window'] = {
-                            'published_after': params.published_after,
-                            'published_before': params.published_before
-                        }
-                    await progress_callback(callback_data)
+                        'quota_used': quota_used,
+                        'max_quota': max_quota
+                    })
+
+                # Check if we've already exhausted quota (check AFTER last call, not before)
+                if quota_used >= max_quota:
+                    logger.info(f"💯 Quota fully exhausted ({quota_used}/{max_quota})")
+                    break
+
+                if not self.quota.can_afford("search", 1):
+                    logger.info("Global quota exhausted")
+                    break
+
+                try:
+                    # Check if this is a channel scan
+                    is_channel_scan = params.query.startswith("CHANNEL:")
+
+                    if is_channel_scan:
+                        # Extract channel ID
+                        channel_id = params.query.replace("CHANNEL:", "")
+                        logger.info(
+                            f"📺 Scanning channel: {channel_id} (fetching 50 recent uploads)"
+                        )
 
-                # Record search in history (for keyword searches only)
-                if self.search_history and not params.query.startswith("CHANNEL:"):
-                    time_window = None
-                    if params.published_after:
-                        time_window = {
-                            'published_after': params.published_after,
-                            'published_before': params.published_before
-                        }
-                    await self.search_history.record_search(
-                        keyword=params.query,
-                        order=params.order.value,
-                        results_count=len(results),
-                        time_window=time_window
-                    )
+                        # Scan channel uploads
+                        results = self.youtube.get_channel_uploads(
+                            channel_id=channel_id,
+                            max_results=50
+                        )
 
-                logger.info(
-                    f"✅ QUERY '{params.query}' order={params.order.value} COMPLETE:"
-                )
-                logger.info(f"   📊 Results: {new_count} new, {rediscovered_count} rediscovered, {skipped_count} already scanned")
-                logger.info(f"   💰 Quota: {search_quota + details_batches} units used")
-                logger.info(f"   📈 Running totals: {videos_discovered} new, {videos_rediscovered} rediscovered, {videos_skipped} skipped")
+                        # Save channel scan to history
+                        self._save_channel_scan(channel_id)
 
-                queries_processed.add(query_key)
+                    else:
+                        # Execute keyword search
+                        time_info = "ALL TIME" if not params.published_after else f"{params.published_after[:10]} to {params.published_before[:10]}"
+                        logger.info(
+                            f"Searching: '{params.query}' "
+                            f"(order={params.order.value}, window={time_info}, "
+                            f"fetching 50 results)"
+                        )
 
-                # Check if we should continue with this keyword (< 50 results = exhausted)
-                if len(results) < 50:
-                    logger.info(f"   ⚠️  EXHAUSTED: Only {len(results)} results (< 50), won't search other orderings")
-                    # Mark all other orderings for this keyword as processed too
-                    for order in [SearchOrder.DATE, SearchOrder.VIEW_COUNT, SearchOrder.RATING, SearchOrder.RELEVANCE]:
-                        queries_processed.add(f"{params.query}|{order.value}")
+                        # YouTubeClient handles pagination automatically
+                        # Only pass published_after if it's set (non-empty)
+                        search_kwargs = {
+                            "query": params.query,
+                            "max_results": 50,
+                            "order": params.order.value,
+                        }
+                        if params.published_after:
+                            search_kwargs["published_after"] = params.published_after
+                        if params.published_before:
+                            search_kwargs["published_before"] = params.published_before
+
+                        results = self.youtube.search_videos(**search_kwargs)
+
+                    # Count actual API calls made (youtube_client paginates internally)
+                    if is_channel_scan:
+                        # Channel scan costs: 1 (channels.list) + 1 (playlistItems.list) = 2 units
+                        search_quota = 2
+                        quota_used += search_quota
+                        self.quota.record_usage("channel_details", 1)  # Use channel_details operation
+                        self.quota.record_usage("playlist_items", 1)  # + playlist_items
+                        logger.info(f"   → Found {len(results)} videos from channel ({search_quota} quota)")
+                    else:
+                        # Keyword search costs: 100 units per page
+                        pages_fetched = (len(results) // 50) + (1 if len(results) % 50 else 0)
+                        search_quota = pages_fetched * 100
+                        quota_used += search_quota
+                        self.quota.record_usage("search", pages_fetched)
+                        logger.info(f"   → Found {len(results)} results ({pages_fetched} pages, {search_quota} quota)")
+
+                    # Get video details (enrich with statistics)
+                    details_batches = 0
+                    if results:
+                        video_ids = [
+                            v['id']['videoId'] if isinstance(v.get('id'), dict) else v['id']
+                            for v in results
+                        ]
+                        # Batch video details in groups of 50
+                        details_batches = (len(video_ids) // 50) + (1 if len(video_ids) % 50 else 0)
+                        results = self.youtube.get_video_details(video_ids)
+                        quota_used += details_batches
+                        self.quota.record_usage("video_details", details_batches)
+                        logger.info(f"   → Enriched with video details ({details_batches} batch calls)")
+
+                    # Process results FIRST to get accurate counts
+                    new_count, rediscovered_count, skipped_count, batch_channels = self._process_results(
+                        results
+                    )
 
-                # Save keyword search to Firestore (aggregate across all orderings)
-                # We'll save once per keyword at the end, not per ordering
-                # self._save_keyword_search(params.query, today, new_count, rediscovered_count, skipped_count)
+                    videos_discovered += new_count
+                    videos_rediscovered += rediscovered_count
+                    videos_skipped += skipped_count
+                    unique_channel_ids.update(batch_channels)
+
+                    # Send query results to callback with detailed breakdown
+                    if progress_callback:
+                        callback_data = {
+                            'type': 'query_result',
+                            'keyword': params.query,
+                            'order': params.order.value,
+                            'results_count': len(results),  # Raw YouTube results
+                            'new_count': new_count,  # Actually new
+                            'rediscovered_count': rediscovered_count,  # Already known
+                            'skipped_count': skipped_count,  # Already scanned
+                            'quota_used': search_quota,
+                            'total_quota_used': quota_used
+                        }
+                        # Include time window if present
+                        if params.published_after:
+                            callback_data['time_window'] = {
+                                'published_after': params.published_after,
+                                'published_before': params.published_before
+                            }
+                        await progress_callback(callback_data)
+
+                    # Record search in history (for keyword searches only)
+                    if self.search_history and not params.query.startswith("CHANNEL:"):
+                        time_window = None
+                        if params.published_after:
+                            time_window = {
+                                'published_after': params.published_after,
+                                'published_before': params.published_before
+                            }
+                        await self.search_history.record_search(
+                            keyword=params.query,
+                            order=params.order.value,
+                            results_count=len(results),
+                            time_window=time_window
+                        )
 
-            except Exception as e:
-                log_exception_json(logger, f"Query '{params.query}' order={params.order.value} failed", e, severity="ERROR", keyword=params.query, order=params.order.value)
-                queries_processed.add(query_key)  # Mark as processed to avoid retry
-                continue
+                    logger.info(
+                        f"✅ QUERY '{params.query}' order={params.order.value} COMPLETE:"
+                    )
+                    logger.info(f"   📊 Results: {new_count} new, {rediscovered_count} rediscovered, {skipped_count} already scanned")
+                    logger.info(f"   💰 Quota: {search_quota + details_batches} units used")
+                    logger.info(f"   📈 Running totals: {videos_discovered} new, {videos_rediscovered} rediscovered, {videos_skipped} skipped")
+
+                    queries_processed.add(query_key)
+
+                    # Check if we should continue with this keyword (< 50 results = exhausted)
+                    if len(results) < 50:
+                        logger.info(f"   ⚠️  EXHAUSTED: Only {len(results)} results (< 50), won't search other orderings")
+                        # Mark all other orderings for this keyword as processed too
+                        for order in [SearchOrder.DATE, SearchOrder.VIEW_COUNT, SearchOrder.RATING, SearchOrder.RELEVANCE]:
+                            queries_processed.add(f"{params.query}|{order.value}")
+
+                    # Save keyword search to Firestore (aggregate across all orderings)
+                    # We'll save once per keyword at the end, not per ordering
+                    # self._save_keyword_search(params.query, today, new_count, rediscovered_count, skipped_count)
+
+                except Exception as e:
+                    log_exception_json(logger, f"Query '{params.query}' order={params.order.value} failed", e, severity="ERROR", keyword=params.query, order=params.order.value)
+                    queries_processed.add(query_key)  # Mark as processed to avoid retry
+                    continue
+        finally:
+            # Commit search history records buffered during the run, even if the
+            # loop failed or was cancelled (unsaved records would be searched again)
+            if self.search_history:
+                await self.search_history.flush()
 
         # Aggregate results per keyword and save to Firestore
         keyword_stats = {}
@@ -520,7 +526,7 @@ class DiscoveryEngine:
                 })
 
                 # Publish to start the pipeline
-                message_data = metadata.model_dump_json().encode("utf-8")
+                message_data = VIDEO_MESSAGE_ADAPTER.dump_json(metadata)
                 self.processor.publisher.publish(self.processor.topic_path, message_data)
                 new_count += 1
                 logger.info(f"      ✅ TRIGGERED: {metadata.video_id} - '{metadata.title}' (matched IPs: {matched_ips})")
@@ -786,7 +792,8 @@ class DiscoveryEngine:
                 scan_ready_topic
             )
 
-            published_count = 0
+            # Publish every message first so the client batches them, then wait
+            futures = []
             for doc in videos:
                 video_data = doc.to_dict()
                 video_id = video_data.get("video_id")
@@ -814,7 +821,10 @@ class DiscoveryEngine:
 
                 # Publish to scan-ready topic
                 message_data = json.dumps(scan_message).encode("utf-8")
-                future = self.processor.publisher.publish(topic_path, message_data)
+                futures.append(self.processor.publisher.publish(topic_path, message_data))
+
+            published_count = 0
+            for future in futures:
                 future.result()  # Wait for publish to complete
 
                 published_count += 1
@@ -835,9 +845,11 @@ class DiscoveryEngine:
 
             # Use channel_id as document ID to ensure we only have one record per channel
             doc_ref = self.processor.firestore.collection("channel_scans").document(channel_id)
+            now = datetime.now(UTC)
             doc_ref.set({
                 "channel_id": channel_id,
-                "last_scanned_at": datetime.now(UTC),
+                "last_scanned_at": now,
+                "next_scan_due_at": now + CHANNEL_RESCAN_INTERVAL,  # Lets the planner range-query cooldowns
                 "scan_count": Increment(1),  # Increment scan count
             }, merge=True)
             logger.debug(f"📺 Saved channel scan: {channel_id}")
@@ -1,7 +1,10 @@
 """YouTube API quota management and optimization."""
 
 import logging
-from datetime import datetime, UTC
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
 from typing import Any
 from zoneinfo import ZoneInfo
 
@@ -37,6 +40,11 @@ class QuotaManager:
     # Warning threshold (percentage)
     WARNING_THRESHOLD = 0.80  # 80%
 
+    # Buffered usage is written at most once per interval, or sooner once
+    # this many units are pending
+    FLUSH_INTERVAL_SECONDS = 1.0
+    FLUSH_MAX_PENDING_UNITS = 1000
+
     def __init__(
         self,
         firestore_client: firestore.Client,
@@ -58,47 +66,110 @@ class QuotaManager:
         self.quota_collection = quota_collection
         self.project_id = project_id or firestore_client.project
 
-        # Try to initialize Cloud Monitoring (only works in production with credentials)
-        self.monitoring_client = None
-        try:
-            self.monitoring_client = monitoring_v3.MetricServiceClient()
-            logger.info("Cloud Monitoring client initialized successfully")
-        except Exception as e:
-            logger.info(f"Cloud Monitoring not available (local mode): {str(e)[:100]}")
+        # Pacific-day key cache: key plus [start, end) Unix timestamps of that day
+        self._today_key = ""
+        self._today_key_bounds = (0.0, 0.0)
+
+        # Cloud Monitoring client is created lazily (only works in production
+        # with credentials); see the monitoring_client property
+        self._monitoring_client: monitoring_v3.MetricServiceClient | None = None
+        self._monitoring_checked = False
+        self._monitoring_lock = threading.Lock()
 
         self._warning_logged = False
         self._operations_since_reload = 0
         self._reload_interval = 10  # Reload from Google every 10 operations
+        self._pending_units = 0  # Recorded but not yet written to Firestore
+        # Guards used_quota; _units_recorded (running total of record_usage)
+        # lets a reload add usage recorded while Google was being queried
+        self._usage_lock = threading.Lock()
+        self._units_recorded = 0
+        self._last_flush = 0.0  # time.monotonic() of the last Firestore write
+
+        # Firestore writes run on one background thread so callers never wait
+        # on the round-trip. At most one write is queued; it picks up whatever
+        # is pending when it runs.
+        self._write_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="quota-writer"
+        )
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._write_scheduled = False
+        self._closed = False  # Set by close(); later writes run on the caller's thread
+
+        # Start from Firestore (one document read) so the constructor does not
+        # wait on Cloud Monitoring; Google's figure replaces it in the background
+        self.used_quota = self._load_today_usage()
+        logger.info(
+            f"QuotaManager initialized: {self.used_quota}/{self.daily_quota} units used (from Firestore)"
+        )
 
-        # Load quota from Google Monitoring if available, otherwise from Firestore
-        if self.monitoring_client:
-            # Try to load from Google Monitoring API
-            self.used_quota = self.fetch_actual_quota_from_google()
-            if self.used_quota == 0:
-                # Fallback to Firestore if Google API fails
-                self.used_quota = self._load_today_usage()
-            logger.info(
-                f"QuotaManager initialized: {self.used_quota}/{self.daily_quota} units used (from Google)"
-            )
-        else:
-            # No monitoring client, use Firestore only (local mode)
-            self.used_quota = self._load_today_usage()
+        self._startup_reload = threading.Thread(
+            target=self._reload_usage_in_background,
+            name="quota-startup-reload",
+            daemon=True,
+        )
+        self._startup_reload.start()
+
+    @property
+    def monitoring_client(self) -> monitoring_v3.MetricServiceClient | None:
+        """Cloud Monitoring client, created on first use (None in local mode)."""
+        with self._monitoring_lock:
+            if not self._monitoring_checked:
+                self._monitoring_checked = True
+                try:
+                    self._monitoring_client = monitoring_v3.MetricServiceClient()
+                    logger.info("Cloud Monitoring client initialized successfully")
+                except Exception as e:
+                    logger.info(f"Cloud Monitoring not available (local mode): {str(e)[:100]}")
+            return self._monitoring_client
+
+    @monitoring_client.setter
+    def monitoring_client(self, client: monitoring_v3.MetricServiceClient | None) -> None:
+        with self._monitoring_lock:
+            self._monitoring_client = client
+            self._monitoring_checked = True
+
+    def _reload_usage_in_background(self) -> None:
+        """Load actual usage from Google after startup (runs on its own thread)."""
+        try:
+            if self.monitoring_client is None:
+                return
+            self.reload_usage()
             logger.info(
-                f"QuotaManager initialized: {self.used_quota}/{self.daily_quota} units used (from Firestore, local mode)"
+                f"QuotaManager synced with Google: {self.used_quota}/{self.daily_quota} units used"
             )
+        except Exception as e:
+            logger.error(f"Failed to load quota usage from Google on startup: {e}")
 
-    def _get_today_key(self) -> str:
+    def _get_today_key(self, now: datetime | None = None) -> str:
         """
         Get today's date key for Firestore document.
 
-        Uses Pacific Time since YouTube API quota resets at midnight PT.
+        Uses Pacific Time since YouTube API quota resets at midnight PT. The
+        key is cached together with the Pacific day's bounds, so it is only
+        rebuilt once the day rolls over.
+
+        Args:
+            now: Current UTC time, if the caller already has one
 
         Returns:
             Date string in YYYY-MM-DD format (Pacific Time)
         """
+        timestamp = now.timestamp() if now else time.time()
+        day_start, day_end = self._today_key_bounds
+        if day_start <= timestamp < day_end:
+            return self._today_key
+
         pacific_tz = ZoneInfo("America/Los_Angeles")
-        now_pacific = datetime.now(UTC).astimezone(pacific_tz)
-        return now_pacific.strftime("%Y-%m-%d")
+        today_pacific = datetime.fromtimestamp(timestamp, pacific_tz).date()
+        midnight = datetime.min.time()
+        self._today_key = today_pacific.strftime("%Y-%m-%d")
+        self._today_key_bounds = (
+            datetime.combine(today_pacific, midnight, pacific_tz).timestamp(),
+            datetime.combine(today_pacific + timedelta(days=1), midnight, pacific_tz).timestamp(),
+        )
+        return self._today_key
 
     def _load_today_usage(self) -> int:
         """
@@ -199,11 +270,14 @@ class QuotaManager:
                 }
             )
 
-            # Sum up quota usage
-            total_quota = 0
-            for result in results:
-                for point in result.points:
-                    total_quota += point.value.int64_value or point.value.double_value or 0
+            # Sum up quota usage: one oneof check per point picks the populated field
+            total_quota = sum(
+                point.value.int64_value
+                if monitoring_v3.TypedValue.pb(point.value).WhichOneof("value") == "int64_value"
+                else point.value.double_value
+                for result in results
+                for point in result.points
+            )
 
             if total_quota > 0:
                 logger.info(f"Fetched actual quota from Google (quota metric): {total_quota} units")
@@ -225,11 +299,17 @@ class QuotaManager:
         Fetches real quota consumption from Google's monitoring API and
         updates both in-memory and Firestore values.
         """
-        previous_usage = self.used_quota
+        # Persist buffered usage first so a Firestore fallback sees it
+        self.flush()
 
-        # Fetch actual usage from Google
+        with self._usage_lock:
+            previous_usage = self.used_quota
+            recorded_before_fetch = self._units_recorded
+
+        # Fetch actual usage from Google (no lock held: record_usage keeps counting)
         actual_usage = self.fetch_actual_quota_from_google()
-        self.used_quota = actual_usage
+        with self._usage_lock:
+            self.used_quota = actual_usage + (self._units_recorded - recorded_before_fetch)
 
         # Update Firestore with actual value
         self._save_actual_usage_to_firestore(actual_usage)
@@ -240,14 +320,34 @@ class QuotaManager:
             )
 
     def _save_actual_usage_to_firestore(self, actual_usage: int) -> None:
-        """Save actual quota usage from Google to Firestore."""
-        today_key = self._get_today_key()
+        """Queue a background write of actual quota usage from Google."""
+        self._submit_write(self._write_actual_usage, actual_usage)
+
+    def _submit_write(self, write, *args) -> None:
+        """
+        Run a Firestore write on the writer thread.
+
+        After close() the writer thread is gone, so usage recorded by requests
+        still finishing during shutdown is written synchronously instead.
+        """
+        if not self._closed:
+            try:
+                self._write_executor.submit(write, *args)
+                return
+            except RuntimeError:
+                pass  # Closed between the check and the submit
+        write(*args)
+
+    def _write_actual_usage(self, actual_usage: int) -> None:
+        """Write actual quota usage from Google to Firestore (writer thread)."""
+        now = datetime.now(UTC)
+        today_key = self._get_today_key(now)
         doc_ref = self.firestore.collection(self.quota_collection).document(today_key)
 
         try:
             doc_ref.set({
                 "units_used": actual_usage,
-                "last_updated": datetime.now(UTC),
+                "last_updated": now,
                 "source": "google_monitoring_api",
             }, merge=True)
             logger.debug(f"Saved actual usage to Firestore: {actual_usage} units")
@@ -258,7 +358,8 @@ class QuotaManager:
         """
         Record API usage and persist to Firestore.
 
-        Updates both in-memory counter and Firestore document.
+        Updates the in-memory counter immediately; the Firestore document is
+        updated in coalesced increments (see _save_to_firestore).
         Logs warning if quota utilization exceeds 80%.
 
         Args:
@@ -281,7 +382,11 @@ class QuotaManager:
             self._operations_since_reload = 0
 
         cost = self.COSTS[operation] * count
-        self.used_quota += cost
+        with self._usage_lock:
+            self.used_quota += cost
+            self._units_recorded += cost
+        with self._pending_lock:
+            self._pending_units += cost
 
         logger.info(
             f"Recorded {operation} usage: {cost} units "
@@ -300,30 +405,83 @@ class QuotaManager:
         # Persist to Firestore
         self._save_to_firestore()
 
+    def flush(self) -> None:
+        """Write any buffered quota usage to Firestore now, on the calling thread."""
+        self._write_pending_usage()
+
+    def close(self) -> None:
+        """
+        Finish queued background writes and flush what is left (on shutdown).
+
+        Safe to call more than once; usage recorded afterwards is written
+        synchronously.
+        """
+        self._closed = True
+        self._write_executor.shutdown(wait=True)
+        self.flush()
+
     def _save_to_firestore(self) -> None:
         """
-        Save current quota usage to Firestore with atomic update.
+        Schedule a background write of buffered quota usage if one is due.
 
-        Uses Firestore transactions to ensure quota updates are atomic
-        and prevent race conditions when multiple service instances run.
+        Writes are coalesced: usage accumulates in memory and is written at
+        most once per FLUSH_INTERVAL_SECONDS, or once FLUSH_MAX_PENDING_UNITS
+        are pending. The write itself runs on the writer thread, so this
+        returns without waiting for Firestore.
         """
-        today_key = self._get_today_key()
-        doc_ref = self.firestore.collection(self.quota_collection).document(today_key)
+        with self._pending_lock:
+            if not self._pending_units or self._write_scheduled:
+                return
 
-        try:
-            # Use set with merge to update atomically
-            doc_ref.set(
-                {
-                    "date": today_key,
-                    "units_used": self.used_quota,
-                    "daily_quota": self.daily_quota,
-                    "updated_at": datetime.now(UTC),
-                },
-                merge=True,
-            )
-            logger.debug(f"Saved quota usage to Firestore: {self.used_quota} units")
-        except Exception as e:
-            logger.error(f"Failed to save quota usage to Firestore: {e}")
+            if (
+                time.monotonic() - self._last_flush < self.FLUSH_INTERVAL_SECONDS
+                and self._pending_units < self.FLUSH_MAX_PENDING_UNITS
+            ):
+                return
+
+            self._write_scheduled = True
+            self._last_flush = time.monotonic()
+
+        self._submit_write(self._write_pending_usage)
+
+    def _write_pending_usage(self) -> None:
+        """
+        Write all buffered quota usage to Firestore as one atomic increment.
+
+        firestore.Increment keeps totals correct when multiple service
+        instances write to the same day document. The write lock keeps at
+        most one write in flight between the writer thread and flush().
+        """
+        with self._write_lock:
+            with self._pending_lock:
+                pending = self._pending_units
+                self._pending_units = 0
+                self._write_scheduled = False
+
+            if not pending:
+                return
+
+            now = datetime.now(UTC)
+            today_key = self._get_today_key(now)
+            doc_ref = self.firestore.collection(self.quota_collection).document(today_key)
+
+            try:
+                # Use set with merge to update atomically
+                doc_ref.set(
+                    {
+                        "date": today_key,
+                        "units_used": firestore.Increment(pending),
+                        "daily_quota": self.daily_quota,
+                        "updated_at": now,
+                    },
+                    merge=True,
+                )
+                logger.debug(f"Saved quota usage to Firestore: +{pending} units")
+            except Exception as e:
+                logger.error(f"Failed to save quota usage to Firestore: {e}")
+                # Keep the units buffered so the next flush retries them
+                with self._pending_lock:
+                    self._pending_units += pending
 
     def get_remaining(self) -> int:
         """
@@ -425,6 +583,9 @@ class QuotaManager:
         Used primarily for testing. In production, quota automatically
         resets when date changes (new Firestore document).
         """
-        self.used_quota = 0
+        with self._usage_lock:
+            self.used_quota = 0
+        with self._pending_lock:
+            self._pending_units = 0
         self._warning_logged = False
         logger.info("Daily quota reset to 0")
@@ -5,7 +5,11 @@ Tracks all YouTube searches in Firestore and intelligently selects
 time windows to avoid redundant queries.
 """
 
+import asyncio
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, UTC
 import random
 
@@ -13,13 +17,74 @@ from google.cloud import firestore
 
 logger = logging.getLogger(__name__)
 
+# Recent-search lookups are served from memory for this long, per keyword+order
+RECENT_SEARCHES_CACHE_TTL_SECONDS = 60
+RECENT_SEARCHES_CACHE_SIZE = 1024
+
+# Fields read from recent searches (projected to shrink payloads)
+RECENT_SEARCH_FIELDS = ['results_count', 'time_window', 'searched_at', 'searched_at_epoch']
+
+# An all-time search is repeated once the last one is older than this (the
+# same 7-day lookback should_search applies to search history)
+ALL_TIME_SEARCH_INTERVAL = timedelta(days=7)
+
+# Weight of the newest search in the running videos-per-day average kept on
+# the search state doc (the rest carries over from the previous average)
+UPLOAD_RATE_SMOOTHING = 0.3
+
+# Days an all-time search is assumed to cover when estimating upload rate
+ALL_TIME_SEARCH_DAYS = 365
+
+SECONDS_PER_DAY = 86400
+
+# How far back a time window ends when not searching "since last time":
+# bucket -> inclusive days_back range, picked with the weights below
+DAYS_BACK_BUCKETS = ('viral', 'recent', 'archive')
+DAYS_BACK_RANGES = {
+    'viral': (0, 60),  # Update view counts on recent videos for virality detection
+    'recent': (30, 365),  # Mix of new discovery + some virality tracking
+    'archive': (365, 365 * 5),  # Pure new discovery focus
+}
+DAYS_BACK_WEIGHTS = (0.50, 0.30, 0.20)
+DAYS_BACK_WEIGHTS_NO_VIRAL = (0.0, 0.80, 0.20)
+DAYS_BACK_LOG_MESSAGES = {
+    'viral': "📈 VIRAL TRACKING: Last 60 days (~%.0f new + rediscovered for view tracking)",
+    'recent': "📅 RECENT MIX: 30-365 days ago (~%.0f new, discoveries + virality)",
+    'archive': "🏛️ ARCHIVE: 1-5 years ago (~%.0f new, pure discovery)",
+}
+
+# Candidate time window sizes (days) by keyword upload frequency
+HIGH_FREQUENCY_WINDOW_DAYS = (7, 10, 14, 21)
+MEDIUM_FREQUENCY_WINDOW_DAYS = (21, 30, 45, 60)
+LOW_FREQUENCY_WINDOW_DAYS = (60, 90, 120, 180)
+VERY_LOW_FREQUENCY_WINDOW_DAYS = (180, 270, 365)
+
+# Buffered history writes are committed once this many are pending, and never
+# more than this many per batch (Firestore batches are capped at 500 writes)
+WRITE_BATCH_SIZE = 400
+
+# Writes kept for retry while commits fail; the oldest searches are dropped
+# beyond this so a long Firestore outage cannot grow the buffer without bound
+MAX_PENDING_WRITES = 2000
+
 
 class SearchHistory:
     """Track and deduplicate YouTube searches."""
 
-    def __init__(self, firestore_client: firestore.Client):
+    def __init__(self, firestore_client: firestore.AsyncClient):
         self.db = firestore_client
         self.collection = self.db.collection('search_history')
+        # One small doc per keyword+order summarizing its history (see record_search)
+        self.state_collection = self.db.collection('search_state')
+        # LRU of (keyword, order) -> (time.monotonic() fetched, state or None)
+        self._state_cache: OrderedDict[tuple[str, str], tuple[float, dict | None]] = OrderedDict()
+        # LRU of (keyword, order) -> (time.monotonic() fetched, days, searches)
+        self._recent_cache: OrderedDict[tuple[str, str], tuple[float, int, list[dict]]] = OrderedDict()
+        # Merge-writes not yet committed: (keyword, order) -> [(doc_ref, data)]
+        self._pending_writes: dict[
+            tuple[str, str], list[tuple[firestore.AsyncDocumentReference, dict]]
+        ] = {}
+        self._pending_count = 0
 
     async def should_search(
         self,
@@ -35,71 +100,221 @@ class SearchHistory:
             - should_search: True if we should run this search
             - time_window_config: Dict with published_after/published_before if needed
         """
-        # Get recent searches for this keyword
-        recent_searches = self._get_recent_searches(keyword, order, days=7)
+        if (keyword, order) in self._pending_writes:
+            # Commit buffered records first so the reads below see them
+            await self.flush()
+
+        now = datetime.now(UTC)
+
+        # The search state doc answers "is an all-time search due?" in one read.
+        # A state doc without last_all_time_at (e.g. only windowed searches recorded
+        # since it was introduced) says nothing either way, so check the history below.
+        state = await self._get_search_state(keyword, order)
+        last_all_time_at = state.get('last_all_time_at') if state is not None else None
+        if last_all_time_at:
+            if now - last_all_time_at >= ALL_TIME_SEARCH_INTERVAL:
+                logger.info(f"🌍 ALL-TIME: '{keyword}' (order={order}) - doing comprehensive all-time search")
+                return True, None
+
+            if 'avg_results_per_day' in state:
+                # Upload rate is kept on the state doc - no history read needed
+                time_window = self._generate_time_window(
+                    keyword,
+                    order,
+                    max(0.01, state['avg_results_per_day']),
+                    self._epoch_seconds(state, 'last_searched_at'),
+                    now=now,
+                )
+                self._log_time_window(keyword, order, time_window)
+                return True, time_window
+
+        if self._cached_recent_searches(keyword, order, days=7) == []:
+            # Known to have no recent searches - skip both history reads
+            logger.info(f"✨ NEW SEARCH: '{keyword}' (order={order}) - first all-time search")
+            return True, None
+
+        # Get recent searches for this keyword, and probe for an all-time search
+        recent_searches, has_done_all_time = await asyncio.gather(
+            self._get_recent_searches(keyword, order, days=7, now=now),
+            self._has_recent_all_time_search(keyword, order, days=7, now=now),
+        )
 
         if not recent_searches:
             # Never searched before - do ONE all-time search
             logger.info(f"✨ NEW SEARCH: '{keyword}' (order={order}) - first all-time search")
             return True, None
 
-        # Check if we've EVER done an all-time search
-        has_done_all_time = any(not search.get('time_window') for search in recent_searches)
-
         if has_done_all_time:
             # All-time already done - NEVER do it again, only use time windows
-            time_window = self._generate_time_window(keyword, order, recent_searches)
-            logger.info(
-                f"🎯 TIME WINDOW: '{keyword}' (order={order}) - "
-                f"all-time done previously, using {time_window['published_after'][:10]} to {time_window['published_before'][:10]}"
+            time_window = self._generate_time_window(
+                keyword,
+                order,
+                self._estimate_upload_frequency(recent_searches),
+                self._epoch_seconds(recent_searches[0], 'searched_at'),
+                now=now,
             )
+            self._log_time_window(keyword, order, time_window)
             return True, time_window
         else:
             # No all-time search yet, but we have some windowed searches - do all-time once
             logger.info(f"🌍 ALL-TIME: '{keyword}' (order={order}) - doing comprehensive all-time search")
             return True, None
 
-    def _get_recent_searches(
+    @staticmethod
+    def _log_time_window(keyword: str, order: str, time_window: dict) -> None:
+        """Log the time window chosen for a keyword+order."""
+        logger.info(
+            "🎯 TIME WINDOW: '%s' (order=%s) - all-time done previously, using %.10s to %.10s",
+            keyword, order, time_window['published_after'], time_window['published_before'],
+        )
+
+    async def _get_recent_searches(
         self,
         keyword: str,
         order: str,
-        days: int = 7
+        days: int = 7,
+        now: datetime | None = None,
     ) -> list[dict]:
-        """Get recent searches for this keyword+order combination."""
-        cutoff = datetime.now(UTC) - timedelta(days=days)
+        """Get recent searches for this keyword+order combination (TTL-cached)."""
+        cache_key = (keyword, order)
+        cached = self._cached_recent_searches(keyword, order, days)
+        if cached is not None:
+            return cached
+
+        cutoff = (now or datetime.now(UTC)) - timedelta(days=days)
 
+        # Served by the (keyword, order, searched_at DESC) composite index
         searches = (
             self.collection
             .where('keyword', '==', keyword)
             .where('order', '==', order)
             .where('searched_at', '>=', cutoff)
             .order_by('searched_at', direction=firestore.Query.DESCENDING)
-            .limit(20)
+            .limit(5)  # Upload-rate estimate looks at the last 5 searches
+            .select(RECENT_SEARCH_FIELDS)
             .stream()
         )
 
         results = []
-        for doc in searches:
+        async for doc in searches:
             data = doc.to_dict()
             results.append(data)
 
+        self._recent_cache[cache_key] = (time.monotonic(), days, results)
+        self._recent_cache.move_to_end(cache_key)
+        if len(self._recent_cache) > RECENT_SEARCHES_CACHE_SIZE:
+            self._recent_cache.popitem(last=False)
+
         return results
 
+    def _cached_recent_searches(self, keyword: str, order: str, days: int) -> list[dict] | None:
+        """Return cached recent searches if still fresh, else None (empty lists are cached too)."""
+        cache_key = (keyword, order)
+        cached = self._recent_cache.get(cache_key)
+        if (
+            cached
+            and cached[1] == days
+            and time.monotonic() - cached[0] < RECENT_SEARCHES_CACHE_TTL_SECONDS
+        ):
+            self._recent_cache.move_to_end(cache_key)
+            return cached[2]
+        return None
+
+    async def _has_recent_all_time_search(
+        self,
+        keyword: str,
+        order: str,
+        days: int = 7,
+        now: datetime | None = None,
+    ) -> bool:
+        """Check for an all-time search of this keyword+order (one count aggregation)."""
+        cutoff = (now or datetime.now(UTC)) - timedelta(days=days)
+
+        # Served by the (keyword, order, time_window, searched_at) composite index
+        results = await (
+            self.collection
+            .where('keyword', '==', keyword)
+            .where('order', '==', order)
+            .where('time_window', '==', None)
+            .where('searched_at', '>=', cutoff)
+            .limit(1)
+            .count()
+            .get()
+        )
+        return results[0][0].value > 0
+
+    @staticmethod
+    def _state_doc_id(keyword: str, order: str) -> str:
+        """
+        Document ID of the search state doc for a keyword+order combination.
+
+        Hashed like history doc IDs, so keywords containing "/" or other
+        characters Firestore rejects in IDs still map to one valid document
+        (keyword and order are stored as fields on the doc).
+        """
+        return hashlib.blake2b(f"{keyword}|{order}".encode(), digest_size=12).hexdigest()
+
+    async def _get_search_state(self, keyword: str, order: str) -> dict | None:
+        """
+        Get the search state doc for this keyword+order combination (TTL-cached).
+
+        Returns:
+            State dict, or None if it has not been written yet (history recorded
+            before search state existed is then read the old way)
+        """
+        cache_key = (keyword, order)
+        cached = self._state_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < RECENT_SEARCHES_CACHE_TTL_SECONDS:
+            self._state_cache.move_to_end(cache_key)
+            return cached[1]
+
+        doc = await self.state_collection.document(self._state_doc_id(keyword, order)).get()
+        state = doc.to_dict() if doc.exists else None
+        self._cache_search_state(cache_key, state)
+        return state
+
+    def _cache_search_state(self, cache_key: tuple[str, str], state: dict | None) -> None:
+        """Store a search state in the bounded in-process cache."""
+        self._state_cache[cache_key] = (time.monotonic(), state)
+        self._state_cache.move_to_end(cache_key)
+        if len(self._state_cache) > RECENT_SEARCHES_CACHE_SIZE:
+            self._state_cache.popitem(last=False)
+
+    @staticmethod
+    def _epoch_seconds(data: dict, field: str) -> float | None:
+        """
+        Epoch seconds of a timestamp field, read from its "<field>_epoch" twin.
+
+        Records written before the epoch twin existed fall back to the datetime.
+        """
+        epoch = data.get(f"{field}_epoch")
+        if epoch is not None:
+            return epoch
+        value = data.get(field)
+        return value.timestamp() if value else None
+
     def _generate_time_window(
         self,
         keyword: str,
         order: str,
-        recent_searches: list[dict]
+        avg_results_per_day: float,
+        last_searched_epoch: float | None,
+        now: datetime | None = None,
     ) -> dict:
         """
         Generate INTELLIGENT random time window for search.
 
         Adapts window size based on keyword upload frequency.
-        """
-        now = datetime.now(UTC)
 
-        # Calculate average results per day from recent searches
-        avg_results_per_day = self._estimate_upload_frequency(recent_searches)
+        Args:
+            keyword: Search keyword
+            order: YouTube search order
+            avg_results_per_day: Estimated videos per day for this keyword
+            last_searched_epoch: Epoch seconds of the last search of this
+                keyword+order (None if unknown)
+            now: Current UTC time, if the caller already has one
+        """
+        now_epoch = now.timestamp() if now else time.time()
 
         # Calculate minimum window size to get ~25 new videos
         min_days_for_25_videos = max(7, int(25 / max(avg_results_per_day, 0.01)))
@@ -107,75 +322,60 @@ class SearchHistory:
         # Determine optimal window size to get ~50 results
         if avg_results_per_day > 5:
             # High frequency: 7-21 days
-            window_days = random.choice([7, 10, 14, 21])
-            logger.debug(f"High frequency keyword ({avg_results_per_day:.1f} videos/day): using {window_days} day window")
+            window_days = random.choice(HIGH_FREQUENCY_WINDOW_DAYS)
+            logger.debug("High frequency keyword (%.1f videos/day): using %d day window", avg_results_per_day, window_days)
         elif avg_results_per_day > 1:
             # Medium frequency: 21-60 days
-            window_days = random.choice([21, 30, 45, 60])
-            logger.debug(f"Medium frequency keyword ({avg_results_per_day:.1f} videos/day): using {window_days} day window")
+            window_days = random.choice(MEDIUM_FREQUENCY_WINDOW_DAYS)
+            logger.debug("Medium frequency keyword (%.1f videos/day): using %d day window", avg_results_per_day, window_days)
         elif avg_results_per_day > 0.1:
             # Low frequency: 60-180 days
-            window_days = random.choice([60, 90, 120, 180])
-            logger.debug(f"Low frequency keyword ({avg_results_per_day:.1f} videos/day): using {window_days} day window")
+            window_days = random.choice(LOW_FREQUENCY_WINDOW_DAYS)
+            logger.debug("Low frequency keyword (%.1f videos/day): using %d day window", avg_results_per_day, window_days)
         else:
             # Very low frequency: 180-365 days
-            window_days = random.choice([180, 270, 365])
-            logger.debug(f"Very low frequency keyword ({avg_results_per_day:.1f} videos/day): using {window_days} day window")
+            window_days = random.choice(VERY_LOW_FREQUENCY_WINDOW_DAYS)
+            logger.debug("Very low frequency keyword (%.1f videos/day): using %d day window", avg_results_per_day, window_days)
 
         # Get time since last search
-        last_search = recent_searches[0] if recent_searches else None
         days_since_last_search = 999  # Default: very long time
 
-        if last_search:
-            time_since = (datetime.now(UTC) - last_search['searched_at']).total_seconds() / 86400
+        if last_searched_epoch:
+            time_since = (now_epoch - last_searched_epoch) / SECONDS_PER_DAY
             days_since_last_search = int(time_since)
 
         # Calculate expected new videos since last search
         expected_new = avg_results_per_day * days_since_last_search
 
-        # Calculate expected total videos (including rediscovered for virality tracking)
-        avg_results_per_day * window_days
-
         # INTELLIGENT VIRAL DETECTION BIAS
         # Balance: NEW discovery + VIRALITY tracking (rediscovered videos)
-        rand = random.random()
-
         if expected_new >= 15 and days_since_last_search <= 30:
             # Enough new content since last search - search "since last time"
             # Threshold: 15 new (lower than 25, because we also want virality tracking)
             days_back = random.randint(0, max(1, days_since_last_search))
             window_days = min(window_days, days_since_last_search + 1)
-            logger.debug(f"🔥 SINCE LAST SEARCH: {days_since_last_search} days (~{expected_new:.0f} new + virality tracking)")
-        elif rand < 0.50 and min_days_for_25_videos <= 60:
-            # VIRAL TRACKING: Last 60 days (50% chance)
-            # Purpose: Update view counts on recent videos for virality detection
-            days_back = random.randint(0, 60)
-            logger.debug(f"📈 VIRAL TRACKING: Last 60 days (~{expected_new:.0f} new + rediscovered for view tracking)")
-        elif rand < 0.80:
-            # Recent content: 30-365 days (30% chance)
-            # Mix of new discovery + some virality tracking
-            days_back = random.randint(30, 365)
-            logger.debug("📅 RECENT MIX: 30-365 days ago (new discoveries + virality)")
+            logger.debug("🔥 SINCE LAST SEARCH: %d days (~%.0f new + virality tracking)", days_since_last_search, expected_new)
         else:
-            # Old content: 1-5 years (20% chance)
-            # Pure new discovery focus
-            max_days_back = 365 * 5
-            days_back = random.randint(365, max_days_back)
-            logger.debug("🏛️ ARCHIVE: 1-5 years ago (pure discovery)")
+            # Viral tracking only pays off when ~25 videos fit in the last 60 days;
+            # otherwise its share goes to the recent mix
+            weights = DAYS_BACK_WEIGHTS if min_days_for_25_videos <= 60 else DAYS_BACK_WEIGHTS_NO_VIRAL
+            bucket = random.choices(DAYS_BACK_BUCKETS, weights)[0]
+            days_back = random.randint(*DAYS_BACK_RANGES[bucket])
+            logger.debug(DAYS_BACK_LOG_MESSAGES[bucket], expected_new)
 
-        # Calculate random time window
-        end_date = now - timedelta(days=days_back)
-        start_date = end_date - timedelta(days=window_days)
+        # Calculate random time window (epoch seconds, formatted once)
+        end_epoch = int(now_epoch) - days_back * SECONDS_PER_DAY
+        start_epoch = end_epoch - window_days * SECONDS_PER_DAY
 
         window = {
-            'published_after': start_date.strftime('%Y-%m-%dT00:00:00Z'),
-            'published_before': end_date.strftime('%Y-%m-%dT23:59:59Z')
+            'published_after': time.strftime('%Y-%m-%dT00:00:00Z', time.gmtime(start_epoch)),
+            'published_before': time.strftime('%Y-%m-%dT23:59:59Z', time.gmtime(end_epoch))
         }
 
         logger.info(
-            f"🎲 Smart window: {window['published_after'][:10]} to "
-            f"{window['published_before'][:10]} ({window_days} days, {days_back} days ago, "
-            f"~{int(avg_results_per_day * window_days)} expected results)"
+            "🎲 Smart window: %s to %s (%d days, %d days ago, ~%d expected results)",
+            window['published_after'][:10], window['published_before'][:10], window_days, days_back,
+            int(avg_results_per_day * window_days),
         )
         return window
 
@@ -193,22 +393,11 @@ class SearchHistory:
 
         for search in recent_searches[:5]:  # Look at last 5 searches
             results = search.get('results_count', 0)
-            time_window = search.get('time_window')
-
-            if time_window:
-                # Calculate days in this window
-                start = datetime.fromisoformat(time_window['published_after'].replace('Z', '+00:00'))
-                end = datetime.fromisoformat(time_window['published_before'].replace('Z', '+00:00'))
-                days = (end - start).days
-
-                if days > 0:
-                    total_results += results
-                    total_days += days
-            else:
-                # All-time search - assume it covered last 365 days
-                if results > 0:
-                    total_results += results
-                    total_days += 365
+            days = self._search_days(results, search.get('time_window'))
+
+            if days:
+                total_results += results
+                total_days += days
 
         if total_days == 0:
             return 1.0
@@ -216,15 +405,26 @@ class SearchHistory:
         avg = total_results / total_days
         return max(0.01, avg)  # Minimum 0.01 to avoid division issues
 
-    def _windows_overlap(self, window1: dict, window2: dict) -> bool:
-        """Check if two time windows overlap."""
-        start1 = datetime.fromisoformat(window1['published_after'].replace('Z', '+00:00'))
-        end1 = datetime.fromisoformat(window1['published_before'].replace('Z', '+00:00'))
-        start2 = datetime.fromisoformat(window2['published_after'].replace('Z', '+00:00'))
-        end2 = datetime.fromisoformat(window2['published_before'].replace('Z', '+00:00'))
+    @staticmethod
+    def _search_days(results_count: int, time_window: dict | None) -> int:
+        """
+        Days of uploads a search covered, for upload-rate estimates.
 
-        # Check if windows overlap
-        return start1 <= end2 and start2 <= end1
+        Returns:
+            Window length in days (ALL_TIME_SEARCH_DAYS for all-time searches),
+            or 0 if the search should not count towards the estimate
+        """
+        if time_window:
+            # Calculate days in this window (epoch bounds on records written by
+            # record_search; older records only have the ISO strings)
+            if 'after_ts' in time_window:
+                return max(0, (time_window['before_ts'] - time_window['after_ts']) // SECONDS_PER_DAY)
+            start = datetime.fromisoformat(time_window['published_after'].replace('Z', '+00:00'))
+            end = datetime.fromisoformat(time_window['published_before'].replace('Z', '+00:00'))
+            return max(0, (end - start).days)
+
+        # All-time search - assume it covered last 365 days (if it found anything)
+        return ALL_TIME_SEARCH_DAYS if results_count > 0 else 0
 
     async def record_search(
         self,
@@ -234,20 +434,124 @@ class SearchHistory:
         time_window: dict | None = None
     ):
         """Record a search in history."""
+        now = datetime.now(UTC)
+        if time_window:
+            # Store epoch bounds next to the ISO strings so readers skip parsing
+            time_window = {
+                **time_window,
+                'after_ts': int(datetime.fromisoformat(time_window['published_after'].replace('Z', '+00:00')).timestamp()),
+                'before_ts': int(datetime.fromisoformat(time_window['published_before'].replace('Z', '+00:00')).timestamp()),
+            }
+
         doc_data = {
             'keyword': keyword,
             'order': order,
             'results_count': results_count,
-            'searched_at': datetime.now(UTC),
+            'searched_at': now,
+            'searched_at_epoch': int(now.timestamp()),
             'time_window': time_window
         }
 
-        # Use compound key: keyword_order_timestamp
-        doc_id = f"{keyword}_{order}_{int(datetime.now(UTC).timestamp())}"
-        doc_id = doc_id.replace(':', '_').replace(' ', '_')
+        # Stable key per keyword+order+window+day: a replayed record overwrites
+        # itself instead of adding a duplicate
+        window_key = f"{time_window['published_after']}/{time_window['published_before']}" if time_window else "all"
+        doc_id = hashlib.blake2b(
+            f"{keyword}|{order}|{window_key}|{now.date().isoformat()}".encode(),
+            digest_size=12,
+        ).hexdigest()
 
-        self.collection.document(doc_id).set(doc_data)
+        state_data = {
+            'keyword': keyword,
+            'order': order,
+            'last_searched_at': now,
+            'last_searched_at_epoch': doc_data['searched_at_epoch'],
+        }
+        if not time_window:
+            state_data['last_all_time_at'] = now
+
+        # Fold this search into the running upload-rate average
+        search_days = self._search_days(results_count, time_window)
+        state = await self._get_search_state(keyword, order)
+        if search_days:
+            rate = results_count / search_days
+            previous_avg = (state or {}).get('avg_results_per_day')
+            if previous_avg is not None:
+                rate = (1 - UPLOAD_RATE_SMOOTHING) * previous_avg + UPLOAD_RATE_SMOOTHING * rate
+            state_data['avg_results_per_day'] = rate
+        self._cache_search_state((keyword, order), {**(state or {}), **state_data})
+
+        # Buffer the writes; they are committed with others in one batch
+        self._pending_writes.setdefault((keyword, order), []).extend([
+            (self.collection.document(doc_id), doc_data),
+            (self.state_collection.document(self._state_doc_id(keyword, order)), state_data),
+        ])
+        self._pending_count += 2
+        # Make the new search visible to the next should_search call
+        self._recent_cache.pop((keyword, order), None)
+
+        if self._pending_count >= WRITE_BATCH_SIZE:
+            await self.flush()
 
         logger.info(
             f"📝 Recorded search: '{keyword}' (order={order}) → {results_count} results"
         )
+
+    async def flush(self) -> None:
+        """
+        Commit all buffered search records to Firestore.
+
+        Records are committed in batches of at most WRITE_BATCH_SIZE writes
+        (one keyword+order's records always share a batch). If a commit fails,
+        it and the batches after it stay buffered for the next flush, capped
+        at MAX_PENDING_WRITES.
+        """
+        if not self._pending_count:
+            return
+
+        pending = list(self._pending_writes.items())
+        self._pending_writes = {}
+        self._pending_count = 0
+
+        chunks: list[list[tuple[tuple[str, str], list]]] = [[]]
+        chunk_size = 0
+        for key, records in pending:
+            if chunk_size and chunk_size + len(records) > WRITE_BATCH_SIZE:
+                chunks.append([])
+                chunk_size = 0
+            chunks[-1].append((key, records))
+            chunk_size += len(records)
+
+        for index, chunk in enumerate(chunks):
+            batch = self.db.batch()
+            for _, records in chunk:
+                for doc_ref, data in records:
+                    batch.set(doc_ref, data, merge=True)
+
+            try:
+                await batch.commit()
+                logger.debug("Committed %d search history writes", sum(len(r) for _, r in chunk))
+            except Exception as e:
+                logger.error(f"Failed to save search history: {e}")
+                # Keep this and later chunks buffered (ahead of records added
+                # meanwhile) so the next flush retries them
+                self._rebuffer([item for failed in chunks[index:] for item in failed])
+                return
+
+    def _rebuffer(self, failed: list[tuple[tuple[str, str], list]]) -> None:
+        """Put uncommitted records back in front of the buffer, dropping the oldest past the cap."""
+        newer = self._pending_writes
+        self._pending_writes = {}
+        for key, records in [*failed, *newer.items()]:
+            self._pending_writes.setdefault(key, []).extend(records)
+        self._pending_count = sum(len(records) for records in self._pending_writes.values())
+
+        dropped = 0
+        while self._pending_count > MAX_PENDING_WRITES and len(self._pending_writes) > 1:
+            key = next(iter(self._pending_writes))
+            records = self._pending_writes.pop(key)
+            self._pending_count -= len(records)
+            dropped += 1
+        if dropped:
+            logger.error(
+                f"Search history buffer full: dropped {dropped} oldest unsaved searches"
+            )
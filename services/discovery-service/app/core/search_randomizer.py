@@ -8,13 +8,21 @@ Randomizes YouTube search parameters to avoid getting the same results every day
 Key insight: Same keyword + different order = completely different top 250 results!
 """
 
+import heapq
+import itertools
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from collections import Counter
+from collections.abc import Callable
 from datetime import datetime, timedelta, UTC
 from enum import Enum
+from typing import Any
 
 from google.cloud import firestore
 
+from app.utils.firestore_utils import stream_in_pages
 from app.utils.logging_utils import log_exception_json
 
 logger = logging.getLogger(__name__)
@@ -29,7 +37,11 @@ class SearchOrder(str, Enum):
     RELEVANCE = "relevance"  # Best matches - finds most relevant content
 
 
-@dataclass
+# RFC 3339 UTC timestamp format for publishedAfter/publishedBefore
+RFC3339_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+@dataclass(slots=True, frozen=True)
 class TimeWindow:
     """Time window for search filtering."""
 
@@ -37,17 +49,15 @@ class TimeWindow:
     days_ago_start: int  # Start of window (days from now)
     days_ago_end: int    # End of window (days from now, 0 = today)
 
-    def get_published_after(self) -> str:
-        """Get publishedAfter parameter (ISO 8601)."""
-        dt = datetime.now(UTC) - timedelta(days=self.days_ago_start)
-        return dt.isoformat().replace("+00:00", "Z")
+    def get_published_after(self, now: datetime | None = None) -> str:
+        """Get publishedAfter parameter (ISO 8601), relative to now (default: current time)."""
+        now = now or datetime.now(UTC)
+        return (now - timedelta(days=self.days_ago_start)).strftime(RFC3339_FORMAT)
 
-    def get_published_before(self) -> str:
-        """Get publishedBefore parameter (ISO 8601)."""
-        if self.days_ago_end == 0:
-            return datetime.now(UTC).isoformat().replace("+00:00", "Z")
-        dt = datetime.now(UTC) - timedelta(days=self.days_ago_end)
-        return dt.isoformat().replace("+00:00", "Z")
+    def get_published_before(self, now: datetime | None = None) -> str:
+        """Get publishedBefore parameter (ISO 8601), relative to now (default: current time)."""
+        now = now or datetime.now(UTC)
+        return (now - timedelta(days=self.days_ago_end)).strftime(RFC3339_FORMAT)
 
 
 # Time windows - 2 months for broader coverage (duplicates are OK with multi-config subscriptions!)
@@ -58,10 +68,27 @@ TIME_WINDOWS = [
 
 # Keywords loaded from Firestore config collection - NO LEGACY FILES!
 
+# Collection reads shared by all SearchRandomizer instances for this long.
+# Short enough that config edits and fresh keyword stats reach the next run.
+COLLECTION_CACHE_TTL_SECONDS = 60
+
+# Collection name -> (time.monotonic() fetched, documents or derived view)
+_collection_cache: dict[str, tuple[float, Any]] = {}
+
+# Fields read from each collection (projected to skip unused fields)
+IP_CONFIG_FIELDS = ["name", "search_keywords", "deleted"]
+KEYWORD_STATS_FIELDS = ["keyword", "tier", "searched_at"]
+CHANNEL_RANKING_FIELDS = ["channel_id", "video_count"]
+CHANNEL_SCAN_FIELDS = ["channel_id"]
 
-@dataclass
+# Minimum time between two scans of the same channel. Written onto each
+# channel_scans doc as next_scan_due_at so cooldown checks are a range query.
+CHANNEL_RESCAN_INTERVAL = timedelta(days=7)
+
+
+@dataclass(slots=True)
 class SearchParams:
-    """Parameters for a single YouTube search."""
+    """Parameters for a single YouTube search (mutable: time window is refined per search)."""
 
     query: str
     order: SearchOrder
@@ -99,7 +126,7 @@ class SearchRandomizer:
             # Load from Firestore config
             self.keywords = self._load_keywords_from_firestore(firestore_client)
 
-        self.orders = list(SearchOrder)
+        self.orders = tuple(SearchOrder)
         self.time_windows = TIME_WINDOWS
 
         logger.info(
@@ -116,29 +143,30 @@ class SearchRandomizer:
         try:
             # Load from ip_configs collection
             logger.debug("Loading keywords from ip_configs collection...")
-            configs = list(firestore_client.collection("ip_configs").stream())
+            configs = self._fetch_collection("ip_configs", IP_CONFIG_FIELDS)
             logger.debug(f"Found {len(configs)} configs in ip_configs collection")
 
-            keywords = []
-            for doc in configs:
-                config_data = doc.to_dict()
-                logger.debug(f"Config {doc.id}: name={config_data.get('name')}, deleted={config_data.get('deleted', False)}, has_search_keywords={bool(config_data.get('search_keywords'))}")
+            debug = logger.isEnabledFor(logging.DEBUG)
+            keyword_lists = []
+            for config_data in configs:
+                name = config_data.get("name")
+                search_keywords = config_data.get("search_keywords") or []
+                if debug:
+                    logger.debug(f"Config: name={name}, deleted={config_data.get('deleted', False)}, has_search_keywords={bool(search_keywords)}")
 
                 # Skip deleted configs
                 if config_data.get("deleted", False):
-                    logger.debug(f"  Skipping deleted config: {config_data.get('name')}")
+                    if debug:
+                        logger.debug(f"  Skipping deleted config: {name}")
                     continue
 
-                # Get search_keywords field
-                search_keywords = config_data.get("search_keywords", [])
                 if search_keywords:
-                    keywords.extend(search_keywords)
-                    logger.info(
-                        f"  📋 Loaded {len(search_keywords)} keywords for '{config_data.get('name')}'"
-                    )
-                else:
-                    logger.debug(f"  No search_keywords for config: {config_data.get('name')}")
+                    keyword_lists.append(search_keywords)
+                    logger.info(f"  📋 Loaded {len(search_keywords)} keywords for '{name}'")
+                elif debug:
+                    logger.debug(f"  No search_keywords for config: {name}")
 
+            keywords = list(itertools.chain.from_iterable(keyword_lists))
             logger.info(f"✅ Loaded {len(keywords)} total keywords from Firestore")
             return keywords
 
@@ -146,6 +174,102 @@ class SearchRandomizer:
             log_exception_json(logger, "Failed to load keywords from Firestore", e, severity="ERROR")
             return []
 
+    def _cached_read(self, name: str, load: Callable[[], Any]) -> Any:
+        """
+        Return a collection read shared across instances for a short TTL.
+
+        Args:
+            name: Firestore collection name (cache key)
+            load: Reads the collection when the cached copy is missing or expired
+
+        Returns:
+            Loaded value (treat as read-only, it is shared)
+        """
+        cached = _collection_cache.get(name)
+        if cached and time.monotonic() - cached[0] < COLLECTION_CACHE_TTL_SECONDS:
+            return cached[1]
+
+        value = load()
+        _collection_cache[name] = (time.monotonic(), value)
+        return value
+
+    def _fetch_collection(self, name: str, fields: list[str]) -> list[dict]:
+        """Read the given fields of a whole collection as dicts (cached, see _cached_read)."""
+        return self._cached_read(
+            name,
+            lambda: [doc.to_dict() for doc in self.firestore.collection(name).select(fields).stream()],
+        )
+
+    def _load_keyword_stats(self) -> dict[str, dict]:
+        """
+        Get the latest tier and search time per searched keyword.
+
+        One newest-first scan of keyword_searches serves both tier grouping
+        and prioritization (cached, see _cached_read).
+
+        Returns:
+            Dict mapping keyword → {"tier": int, "last_searched": datetime}
+        """
+        def load() -> dict[str, dict]:
+            query = (
+                self.firestore.collection("keyword_searches")
+                .select(KEYWORD_STATS_FIELDS)
+                .order_by("searched_at", direction=firestore.Query.DESCENDING)
+            )
+            stats = {}
+            for doc in stream_in_pages(query):
+                data = doc.to_dict()
+                keyword = data.get("keyword")
+
+                # Newest first, so the first record per keyword is the latest
+                if keyword in stats:
+                    continue
+
+                tier = data.get("tier", 3)  # Default to Tier 3 if missing
+                stats[keyword] = {
+                    "tier": int(tier) if isinstance(tier, (int, str)) else 3,
+                    "last_searched": data.get("searched_at"),
+                }
+            return stats
+
+        return self._cached_read("keyword_searches", load)
+
+    def _load_channel_ranking(self) -> list[dict]:
+        """
+        Get the top 100 channels by video count (cached, see _cached_read).
+
+        Only the ranking is cached: a retried plan reuses it, while scan
+        cooldowns are still checked live so just-scanned channels are skipped.
+
+        Returns:
+            Channel dicts with channel_id and video_count, most videos first
+        """
+        def load() -> list[dict]:
+            # Query channels collection (much more efficient than scanning all videos)
+            # Sort by video_count descending to prioritize active channels
+            channels_query = (
+                self.firestore.collection("channels")
+                .select(CHANNEL_RANKING_FIELDS)
+                .order_by("video_count", direction=firestore.Query.DESCENDING)
+                .limit(100)  # Get top 100 most active channels
+                .stream()
+            )
+
+            # Build list of all channels
+            all_channels = []
+            for doc in channels_query:
+                data = doc.to_dict()
+                channel_id = data.get("channel_id")
+                video_count = data.get("video_count", 0)
+                if channel_id and video_count > 0:
+                    all_channels.append({
+                        "channel_id": channel_id,
+                        "video_count": video_count,
+                    })
+            return all_channels
+
+        return self._cached_read("channels", load)
+
     def _prioritize_keywords(self, max_keywords: int) -> list[str]:
         """
         Prioritize keywords by tier and search history.
@@ -169,64 +293,34 @@ class SearchRandomizer:
             return self.keywords[:max_keywords]
 
         try:
-            # Get search history for all keywords
-            search_history = {}
-            tier_map = {}
-
-            # Load all keyword search records
-            keyword_docs = list(self.firestore.collection("keyword_searches").stream())
-
-            # Build search history map
-            for doc in keyword_docs:
-                data = doc.to_dict()
-                keyword = data.get("keyword")
-                if keyword not in search_history:
-                    search_history[keyword] = {
-                        "last_searched": data.get("searched_at"),
-                        "tier": data.get("tier", 3),  # Default to Tier 3 if missing
-                    }
-
-            # Assign default tier for never-searched keywords
-            for keyword in self.keywords:
-                if keyword not in search_history:
-                    search_history[keyword] = {
-                        "last_searched": None,  # Never searched!
-                        "tier": 3,  # Start at Tier 3, will upgrade based on efficiency
-                    }
-                tier_map[keyword] = search_history[keyword]["tier"]
-
-            # Sort by: tier (ascending), never_searched (True first), last_searched (oldest first)
-            def sort_key(keyword):
-                info = search_history[keyword]
-                tier = info["tier"]
-                # Convert tier to int for sorting (handle both int and str)
-                tier_int = int(tier) if isinstance(tier, (int, str)) else 3
-                never_searched = info["last_searched"] is None
-                last_searched = info["last_searched"] or datetime.min.replace(tzinfo=UTC)
-
-                # Return tuple: (tier, not never_searched, last_searched)
-                # - Lower tier = higher priority
-                # - never_searched=True → not never_searched=False → higher priority
-                # - Older last_searched → higher priority
-                return (tier_int, not never_searched, last_searched)
-
-            sorted_keywords = sorted(self.keywords, key=sort_key)
+            keyword_stats = self._load_keyword_stats()
+
+            # Decorate once: (tier, searched, last_searched_ts, position, keyword)
+            # - Lower tier = higher priority
+            # - Never-searched (0) before searched (1)
+            # - Older last_searched → higher priority
+            # - Position keeps the original order for ties
+            decorated = []
+            for position, keyword in enumerate(self.keywords):
+                info = keyword_stats.get(keyword)
+                if info is None or info["last_searched"] is None:
+                    # Never searched: Tier 3 until efficiency upgrades it
+                    tier = info["tier"] if info else 3
+                    decorated.append((tier, 0, 0.0, position, keyword))
+                else:
+                    decorated.append((info["tier"], 1, info["last_searched"].timestamp(), position, keyword))
 
-            # Take top N
-            selected = sorted_keywords[:max_keywords]
+            # Take top N (partial heap select, no full sort)
+            top = heapq.nsmallest(max_keywords, decorated)
+            selected = [entry[-1] for entry in top]
 
-            # Log selection breakdown
-            tier_counts = {}
-            never_searched_count = 0
-            for kw in selected:
-                tier = search_history[kw]["tier"]
-                tier_counts[tier] = tier_counts.get(tier, 0) + 1
-                if search_history[kw]["last_searched"] is None:
-                    never_searched_count += 1
+            # Log selection breakdown (tier and searched flag are already in each entry)
+            tier_counts = Counter(entry[0] for entry in top)
+            never_searched_count = sum(1 for entry in top if entry[1] == 0)
 
             logger.info(
                 f"🎯 Selected {len(selected)}/{len(self.keywords)} keywords by priority: "
-                f"Tier 1={tier_counts.get(1, 0)}, Tier 2={tier_counts.get(2, 0)}, Tier 3={tier_counts.get(3, 0)}, "
+                f"Tier 1={tier_counts[1]}, Tier 2={tier_counts[2]}, Tier 3={tier_counts[3]}, "
                 f"Never-searched={never_searched_count}"
             )
 
@@ -265,10 +359,18 @@ class SearchRandomizer:
         """
         import random
 
-        # Get channels to scan (if Firestore available)
-        channels_to_scan = []
+        # Get channels to scan and keywords grouped by tier (if Firestore available).
+        # The two reads are independent, so they run concurrently.
         if self.firestore:
-            channels_to_scan = self._get_channels_to_scan(max_channels=5)  # 5 channels = 10 quota
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-plan") as pool:
+                channels_future = pool.submit(self._get_channels_to_scan, max_channels=5)  # 5 channels = 10 quota
+                keywords_future = pool.submit(self._get_keywords_by_tier)
+                channels_to_scan = channels_future.result()
+                keywords_by_tier = keywords_future.result()
+        else:
+            logger.warning("No Firestore client, using simple keyword list")
+            channels_to_scan = []
+            keywords_by_tier = {1: self.keywords, 2: [], 3: []}
 
         # Allocate quota: reserve for channels only if we have channels to scan
         if channels_to_scan:
@@ -286,13 +388,6 @@ class SearchRandomizer:
             )
             logger.info("📺 No channels with infringements found yet")
 
-        # Get all keywords grouped by tier
-        if not self.firestore:
-            logger.warning("No Firestore client, using simple keyword list")
-            keywords_by_tier = {1: self.keywords, 2: [], 3: []}
-        else:
-            keywords_by_tier = self._get_keywords_by_tier()
-
         # Calculate how many keyword queries we can make
         max_queries = keyword_quota // 100  # Each query = 100 units
 
@@ -305,64 +400,47 @@ class SearchRandomizer:
         # All-time search (no date filter)
         now = datetime.now(UTC)
         published_after = None  # All time!
-        published_before = now.isoformat().replace("+00:00", "Z")
+        published_before = now.strftime(RFC3339_FORMAT)
 
         # Start with channel scans (these go first for priority)
         search_plan = []
 
         for channel in channels_to_scan:
             params = SearchParams(
-                query="",  # Empty query means channel scan
+                # Channel_id in the query field marks a channel scan (handled by discovery_engine)
+                query=f"CHANNEL:{channel['channel_id']}",
                 order=SearchOrder.DATE,  # Most recent uploads
                 published_after="",
                 published_before=published_before,
                 max_results=50,
                 page_number=1,
             )
-            # Store channel_id in query field temporarily (will be handled by discovery_engine)
-            params.query = f"CHANNEL:{channel['channel_id']}"
             search_plan.append(params)
             logger.debug(f"  📺 Added channel scan: {channel['channel_id']} ({channel['video_count']} videos)")
 
         # Generate randomized keyword search plan
-        seen_combinations = set()  # Track keyword+order to avoid duplicates
-
         # Tier weights (probability of selecting each tier)
         tier_weights = {1: 0.50, 2: 0.35, 3: 0.15}
 
-        # Keep trying until we have max_queries unique KEYWORD queries
-        # (channel scans are already in search_plan, so track keywords separately)
-        keyword_queries_added = 0
-        attempts = 0
-        max_attempts = max_queries * 10  # Prevent infinite loop
-
-        while keyword_queries_added < max_queries and attempts < max_attempts:
-            attempts += 1
-
-            # Randomly select tier (weighted)
-            available_tiers = [t for t in [1, 2, 3] if keywords_by_tier.get(t, [])]
-            if not available_tiers:
-                logger.warning("No keywords available in any tier!")
-                break
-
-            # Weighted random tier selection
-            tier_probs = [tier_weights[t] for t in available_tiers]
-            tier = random.choices(available_tiers, weights=tier_probs, k=1)[0]
-
-            # Randomly select keyword from that tier
-            keywords_in_tier = keywords_by_tier[tier]
-            keyword = random.choice(keywords_in_tier)
-
-            # Randomly select ordering
-            order = random.choice(self.orders)
-
-            # Check if we've already added this combination
-            combo_key = f"{keyword}|{order.value}"
-            if combo_key in seen_combinations:
-                # Skip duplicate, keep trying
+        # Weighted sampling without replacement over every keyword+order combination:
+        # each combination draws an exponential arrival time with rate = its weight and
+        # the earliest max_queries arrivals win. A tier's weight is split evenly across
+        # its keywords and orders, so tiers keep their share with no duplicate retries.
+        candidates = []
+        for tier, tier_keywords in keywords_by_tier.items():
+            unique_keywords = dict.fromkeys(tier_keywords)
+            if tier not in tier_weights or not unique_keywords:
                 continue
-            seen_combinations.add(combo_key)
+            weight = tier_weights[tier] / (len(unique_keywords) * len(self.orders))
+            for keyword in unique_keywords:
+                for order in self.orders:
+                    candidates.append((random.expovariate(weight), keyword, order))
+
+        if not candidates:
+            logger.warning("No keywords available in any tier!")
 
+        keyword_queries_added = 0
+        for _, keyword, order in heapq.nsmallest(max_queries, candidates):
             params = SearchParams(
                 query=keyword,
                 order=order,
@@ -374,8 +452,10 @@ class SearchRandomizer:
             search_plan.append(params)
             keyword_queries_added += 1
 
-        if attempts >= max_attempts:
-            logger.warning(f"Reached max attempts ({max_attempts}) generating queries. Got {keyword_queries_added}/{max_queries} keyword queries")
+        if candidates and keyword_queries_added < max_queries:
+            logger.warning(
+                f"Every keyword+order combination used: got {keyword_queries_added}/{max_queries} keyword queries"
+            )
 
         # Shuffle the plan for extra randomness
         random.shuffle(search_plan)
@@ -404,25 +484,10 @@ class SearchRandomizer:
             Dict mapping tier (1, 2, 3) to list of keywords
         """
         try:
-            # Get search history for all keywords
-            keyword_docs = list(self.firestore.collection("keyword_searches").stream())
-
-            # Build map of keyword → tier (use latest tier)
-            keyword_tiers = {}
-            seen_keywords = set()
-
-            for doc in keyword_docs:
-                data = doc.to_dict()
-                keyword = data.get("keyword")
-
-                # Only use latest record per keyword
-                if keyword in seen_keywords:
-                    continue
-                seen_keywords.add(keyword)
-
-                tier = data.get("tier", "3")  # Default to Tier 3
-                tier_int = int(tier) if isinstance(tier, (int, str)) else 3
-                keyword_tiers[keyword] = tier_int
+            # Latest tier per keyword
+            keyword_tiers = {
+                keyword: info["tier"] for keyword, info in self._load_keyword_stats().items()
+            }
 
             # Assign Tier 3 to never-searched keywords
             for keyword in self.keywords:
@@ -457,62 +522,31 @@ class SearchRandomizer:
             List of channel dicts with channel_id and video_count
         """
         try:
-            from datetime import timedelta
-
-            # Query channels collection (much more efficient than scanning all videos)
-            # Sort by video_count descending to prioritize active channels
-            channels_query = (
-                self.firestore.collection("channels")
-                .order_by("video_count", direction=firestore.Query.DESCENDING)
-                .limit(100)  # Get top 100 most active channels
-                .stream()
-            )
-
-            # Build list of all channels
-            all_channels = []
-            for doc in channels_query:
-                data = doc.to_dict()
-                channel_id = data.get("channel_id")
-                video_count = data.get("video_count", 0)
-                if channel_id and video_count > 0:
-                    all_channels.append({
-                        "channel_id": channel_id,
-                        "video_count": video_count,
-                    })
+            # Most active channels (ranking is cached; cooldowns below are always read fresh)
+            all_channels = self._load_channel_ranking()
 
             if not all_channels:
                 logger.info("📺 No channels found yet")
                 return []
 
-            # Get channel scan history
-            scan_history = {}
-            channel_scans = self.firestore.collection("channel_scans").stream()
-            for doc in channel_scans:
-                data = doc.to_dict()
-                channel_id = data.get("channel_id")
-                last_scanned = data.get("last_scanned_at")
-                if channel_id and last_scanned:
-                    scan_history[channel_id] = last_scanned
-
-            # Filter out recently scanned channels (< 7 days ago)
+            # Channels still in cooldown (next_scan_due_at is denormalized on write,
+            # so this is a single range query instead of a full channel_scans scan;
+            # scans written before the field existed are filled in by
+            # scripts/backfill-channel-scan-due.py)
             now = datetime.now(UTC)
-            min_scan_interval = timedelta(days=7)
-            channels_to_scan = []
+            cooling_down = (
+                self.firestore.collection("channel_scans")
+                .select(CHANNEL_SCAN_FIELDS)
+                .where(filter=firestore.FieldFilter("next_scan_due_at", ">", now))
+                .stream()
+            )
+            recently_scanned = {doc.get("channel_id") for doc in cooling_down}
 
+            channels_to_scan = []
             for channel in all_channels:
-                channel_id = channel["channel_id"]
-                last_scanned = scan_history.get(channel_id)
-
-                # Skip if scanned recently
-                if last_scanned:
-                    if isinstance(last_scanned, str):
-                        last_scanned = datetime.fromisoformat(last_scanned.replace('Z', '+00:00'))
-
-                    time_since_scan = now - last_scanned.replace(tzinfo=UTC)
-                    if time_since_scan < min_scan_interval:
-                        logger.debug(f"  ⏭️  Skipping {channel_id}: scanned {time_since_scan.days}d ago")
-                        continue
-
+                if channel["channel_id"] in recently_scanned:
+                    logger.debug(f"  ⏭️  Skipping {channel['channel_id']}: still in scan cooldown")
+                    continue
                 channels_to_scan.append(channel)
 
             # Already sorted by video_count from Firestore query
@@ -534,6 +568,7 @@ class SearchRandomizer:
         index: int,
         day_offset: int = 0,
         pages_per_keyword: int = 5,
+        now: datetime | None = None,
     ) -> SearchParams:
         """
         Get search parameters for a specific query index.
@@ -545,6 +580,7 @@ class SearchRandomizer:
             index: Query index (0 to num_queries-1)
             day_offset: Days from today (0=today, 1=tomorrow, etc.)
             pages_per_keyword: Pages to fetch per keyword
+            now: Reference time, shared when building many params (default: current time)
 
         Returns:
             Search parameters for this index
@@ -559,7 +595,8 @@ class SearchRandomizer:
         keyword = self.keywords[keyword_idx]
 
         # Get rotation for this day
-        day_of_year = (datetime.now(UTC) + timedelta(days=day_offset)).timetuple().tm_yday
+        now = now or datetime.now(UTC)
+        day_of_year = (now + timedelta(days=day_offset)).timetuple().tm_yday
         order_idx = day_of_year % len(self.orders)
         window_idx = (day_of_year // len(self.orders)) % len(self.time_windows)
 
@@ -569,8 +606,8 @@ class SearchRandomizer:
         return SearchParams(
             query=keyword,
             order=order,
-            published_after=time_window.get_published_after(),
-            published_before=time_window.get_published_before(),
+            published_after=time_window.get_published_after(now),
+            published_before=time_window.get_published_before(now),
             max_results=50,
             page_number=page_number,
         )
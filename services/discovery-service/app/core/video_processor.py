@@ -1,21 +1,92 @@
 """Video processing operations - zero duplication."""
 
+import functools
 import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, UTC, timedelta
 from typing import Any
 
 from google.cloud import firestore, pubsub_v1
+from pydantic import TypeAdapter
 
 from ..config import settings
 from ..models import VideoMetadata, VideoStatus
 
 logger = logging.getLogger(__name__)
 
-# Cache for IP configs (refresh every 5 minutes)
-_ip_configs_cache: list[dict[str, Any]] | None = None
+# Cache for IP configs (refresh every 5 minutes), published as one immutable
+# (prefilter, patterns) tuple so readers never mix an old and a new half:
+# - prefilter: one alternation over every pattern, so videos matching no IP skip the per-IP loop
+# - patterns: flattened (pattern_lc, ip_id) pairs grouped by config
+IpMatcher = tuple[re.Pattern[str] | None, tuple[tuple[str, str], ...]]
+_EMPTY_IP_MATCHER: IpMatcher = (None, ())
+_ip_configs_cache: IpMatcher | None = None
 _ip_configs_cache_time: datetime | None = None
 _IP_CACHE_TTL_SECONDS = 300  # 5 minutes
+_ip_refresh_lock = threading.Lock()
+_ip_refresh_in_progress = False
+
+# Channel risk scores (channel_id -> (score, time.monotonic() cached)).
+# Infringement history changes over hours, so a few minutes of staleness is fine.
+_channel_risk_cache: dict[str, tuple[int, float]] = {}
+_channel_risk_lock = threading.Lock()
+_CHANNEL_RISK_TTL_SECONDS = 300  # 5 minutes
+_CHANNEL_RISK_CACHE_MAX = 50_000
+
+# New videos per Firestore batch commit (each adds a video doc and a channel
+# stats write, plus two shared counters; Firestore allows 500 writes per batch)
+MAX_VIDEOS_PER_WRITE_BATCH = 240
+
+# Concurrent existing-video updates per process_batch call (I/O-bound)
+EXISTING_VIDEO_UPDATE_WORKERS = 8
+
+# Risk tier for every score 0-100 (index by score)
+_RISK_TIERS = tuple(
+    "CRITICAL" if score >= 80
+    else "HIGH" if score >= 60
+    else "MEDIUM" if score >= 40
+    else "LOW" if score >= 20
+    else "VERY_LOW"
+    for score in range(101)
+)
+
+# Serializes PubSub messages straight to UTF-8 JSON bytes (no intermediate str)
+VIDEO_MESSAGE_ADAPTER = TypeAdapter(VideoMetadata)
+
+# Thumbnail sizes in order of preference
+_THUMBNAIL_QUALITIES = ("high", "medium", "default")
+
+# Seconds per ISO 8601 duration time unit (PT#H#M#S)
+_DURATION_UNIT_SECONDS = {"H": 3600, "M": 60, "S": 1}
+
+
+def _cached_channel_risk(channel_id: str) -> int | None:
+    """Return a channel's cached risk score if it is still fresh."""
+    cached = _channel_risk_cache.get(channel_id)
+    if cached and time.monotonic() - cached[1] < _CHANNEL_RISK_TTL_SECONDS:
+        return cached[0]
+    return None
+
+
+def _remember_channel_risk(channel_id: str, risk: int, cached_at: float) -> None:
+    """Record a channel's risk score (oldest entries evicted first)."""
+    with _channel_risk_lock:
+        _channel_risk_cache.pop(channel_id, None)
+        if len(_channel_risk_cache) >= _CHANNEL_RISK_CACHE_MAX:
+            del _channel_risk_cache[next(iter(_channel_risk_cache))]
+        _channel_risk_cache[channel_id] = (risk, cached_at)
+
+
+def _log_publish_result(video_id: str, future) -> None:
+    """Log the outcome of a PubSub publish (done callback)."""
+    try:
+        message_id = future.result()
+        logger.info("Published video %s to PubSub: %s", video_id, message_id)
+    except Exception as e:
+        logger.error(f"Failed to publish video {video_id}: {e}")
 
 
 class VideoProcessor:
@@ -57,81 +128,76 @@ class VideoProcessor:
 
         logger.info("VideoProcessor initialized")
 
-    def _increment_hourly_stat(self, stat_type: str, timestamp: datetime | None = None):
+    def _hourly_stat_write(
+        self, stat_type: str, count: int = 1, timestamp: datetime | None = None
+    ) -> tuple[firestore.DocumentReference, dict[str, Any]]:
         """
-        Atomically increment hourly stats counter in Firestore.
+        Build the atomic increment of an hourly stats counter.
 
         Args:
             stat_type: Type of stat to increment ("discoveries", "analyses", "infringements")
+            count: Amount to increment by
             timestamp: Timestamp to use (defaults to now)
-        """
-        try:
-            if timestamp is None:
-                timestamp = datetime.now(UTC)
-
-            # Round to hour
-            hour = timestamp.replace(minute=0, second=0, microsecond=0)
-            hour_key = hour.strftime("%Y-%m-%d_%H")  # e.g., "2025-11-07_10"
-
-            stats_ref = self.firestore.collection(self.hourly_stats_collection).document(hour_key)
-
-            # Atomic increment
-            stats_ref.set({
-                "hour": hour,
-                stat_type: firestore.Increment(1),
-                "updated_at": firestore.SERVER_TIMESTAMP,
-            }, merge=True)
-
-        except Exception as e:
-            # Don't fail the main operation if stats update fails
-            logger.warning(f"Failed to increment hourly stat {stat_type}: {e}")
 
-    def _update_channel_stats(self, metadata: VideoMetadata):
+        Returns:
+            (document ref, merge payload)
         """
-        Update channel aggregate stats when a new video is discovered.
-
-        Args:
-            metadata: Video metadata
+        if timestamp is None:
+            timestamp = datetime.now(UTC)
+
+        # Round to hour
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        hour_key = hour.strftime("%Y-%m-%d_%H")  # e.g., "2025-11-07_10"
+
+        stats_ref = self.firestore.collection(self.hourly_stats_collection).document(hour_key)
+        return stats_ref, {
+            "hour": hour,
+            stat_type: firestore.Increment(count),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }
+
+    def _channel_stats_write(
+        self, videos: list[VideoMetadata], now: datetime
+    ) -> tuple[firestore.DocumentReference, dict[str, Any]]:
         """
-        try:
-            channel_ref = self.firestore.collection("channels").document(metadata.channel_id)
+        Build the channel aggregate stats update for newly discovered videos.
 
-            # Atomic increments for channel stats
-            channel_ref.set({
-                "channel_id": metadata.channel_id,
-                "channel_title": metadata.channel_title,
-                "total_videos_found": firestore.Increment(1),
-                "total_views": firestore.Increment(metadata.view_count or 0),
-                "last_seen_at": datetime.now(UTC),
-                "updated_at": firestore.SERVER_TIMESTAMP,
-            }, merge=True)
-
-            logger.debug(f"Updated channel stats for {metadata.channel_id}")
-
-        except Exception as e:
-            # Don't fail the main operation if stats update fails
-            logger.warning(f"Failed to update channel stats: {e}")
+        Args:
+            videos: New videos from one channel
+            now: Timestamp for last_seen_at
 
-    def _increment_global_stat(self, stat_name: str, increment: int = 1):
+        Returns:
+            (document ref, merge payload)
         """
-        Atomically increment global statistics counter.
+        latest = videos[-1]
+        channel_ref = self.firestore.collection("channels").document(latest.channel_id)
+        return channel_ref, {
+            "channel_id": latest.channel_id,
+            "channel_title": latest.channel_title,
+            "total_videos_found": firestore.Increment(len(videos)),
+            "total_views": firestore.Increment(sum(v.view_count or 0 for v in videos)),
+            "last_seen_at": now,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }
+
+    def _global_stat_write(
+        self, stat_name: str, increment: int = 1
+    ) -> tuple[firestore.DocumentReference, dict[str, Any]]:
+        """
+        Build the atomic increment of a global statistics counter.
 
         Args:
             stat_name: Name of the stat to increment (e.g., "total_videos", "total_channels")
             increment: Amount to increment by
-        """
-        try:
-            stats_ref = self.firestore.collection("system_stats").document("global")
 
-            # Atomic increment
-            stats_ref.set({
-                stat_name: firestore.Increment(increment),
-                "updated_at": firestore.SERVER_TIMESTAMP,
-            }, merge=True)
-
-        except Exception as e:
-            # Don't fail the main operation if stats update fails
-            logger.warning(f"Failed to increment global stat {stat_name}: {e}")
+        Returns:
+            (document ref, merge payload)
+        """
+        stats_ref = self.firestore.collection("system_stats").document("global")
+        return stats_ref, {
+            stat_name: firestore.Increment(increment),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }
 
     def extract_metadata(self, video_data: dict[str, Any]) -> VideoMetadata:
         """
@@ -166,10 +232,8 @@ class VideoProcessor:
         # Parse published date
         published_at_str = snippet.get("publishedAt", "")
         try:
-            published_at = datetime.fromisoformat(
-                published_at_str.replace("Z", "+00:00")
-            )
-        except (ValueError, AttributeError):
+            published_at = datetime.fromisoformat(published_at_str)  # Accepts "Z" (Python 3.11+)
+        except (ValueError, TypeError):
             logger.warning(
                 f"Invalid publishedAt for video {video_id}: {published_at_str}"
             )
@@ -180,12 +244,13 @@ class VideoProcessor:
         duration_seconds = self._parse_duration(duration_str)
 
         # Extract thumbnail (prefer high quality)
-        thumbnails = snippet.get("thumbnails", {})
-        thumbnail_url = (
-            thumbnails.get("high", {}).get("url", "")
-            or thumbnails.get("medium", {}).get("url", "")
-            or thumbnails.get("default", {}).get("url", "")
-        )
+        thumbnails = snippet.get("thumbnails") or {}
+        thumbnail_url = ""
+        for quality in _THUMBNAIL_QUALITIES:
+            thumbnail = thumbnails.get(quality)
+            if thumbnail and (url := thumbnail.get("url")):
+                thumbnail_url = url
+                break
 
         return VideoMetadata(
             video_id=video_id,
@@ -219,20 +284,55 @@ class VideoProcessor:
         Returns:
             Total seconds (0 if parsing fails)
         """
-        pattern = r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?"
-        match = re.match(pattern, duration_str)
-
-        if not match:
+        if not duration_str.startswith("PT"):
             logger.warning(f"Cannot parse duration: {duration_str}")
             return 0
 
-        hours = int(match.group(1) or 0)
-        minutes = int(match.group(2) or 0)
-        seconds = int(match.group(3) or 0)
+        # Single pass: accumulate digits, apply the unit on H/M/S
+        total = 0
+        value = 0
+        for char in duration_str[2:]:
+            if "0" <= char <= "9":
+                value = value * 10 + (ord(char) - 48)
+            elif char in _DURATION_UNIT_SECONDS:
+                total += value * _DURATION_UNIT_SECONDS[char]
+                value = 0
+            else:
+                logger.warning(f"Cannot parse duration: {duration_str}")
+                return 0
+
+        return total
+
+    def _get_existing_videos(
+        self, videos: list[VideoMetadata]
+    ) -> dict[str, firestore.DocumentSnapshot] | None:
+        """
+        Fetch the stored documents for a batch of videos in one get_all call.
 
-        return hours * 3600 + minutes * 60 + seconds
+        Args:
+            videos: Videos to look up
 
-    def update_if_existing(self, metadata: VideoMetadata) -> tuple[bool, bool]:
+        Returns:
+            Dict mapping video_id → snapshot (exists=False for new videos),
+            or None if the bulk read failed (callers fall back to per-video reads)
+        """
+        if not videos:
+            return {}
+
+        collection = self.firestore.collection(self.videos_collection)
+        refs = [collection.document(v.video_id) for v in videos]
+        try:
+            return {snapshot.id: snapshot for snapshot in self.firestore.get_all(refs)}
+        except Exception as e:
+            logger.error(f"Error fetching {len(refs)} existing videos: {e}")
+            return None
+
+    def update_if_existing(
+        self,
+        metadata: VideoMetadata,
+        snapshot: firestore.DocumentSnapshot | None = None,
+        now: datetime | None = None,
+    ) -> tuple[bool, bool]:
         """
         Update video metadata if it already exists (duplicates = rescans for virality tracking).
 
@@ -243,6 +343,8 @@ class VideoProcessor:
 
         Args:
             metadata: Fresh video metadata from YouTube
+            snapshot: Prefetched video document (read from Firestore if not given)
+            now: Current time, shared across a batch (defaults to now)
 
         Returns:
             (is_existing, needs_rescore):
@@ -252,7 +354,7 @@ class VideoProcessor:
         doc_ref = self.firestore.collection(self.videos_collection).document(metadata.video_id)
 
         try:
-            doc = doc_ref.get()
+            doc = snapshot if snapshot is not None else doc_ref.get()
 
             if not doc.exists:
                 # Brand new video
@@ -264,8 +366,9 @@ class VideoProcessor:
             new_views = metadata.view_count
 
             # Calculate view velocity (views gained since last check)
+            now = now or datetime.now(UTC)
             views_gained = new_views - old_views
-            time_elapsed_hours = (datetime.now(UTC) - old_data.get("updated_at", datetime.now(UTC))).total_seconds() / 3600
+            time_elapsed_hours = (now - old_data.get("updated_at", now)).total_seconds() / 3600
             view_velocity = int(views_gained / time_elapsed_hours) if time_elapsed_hours > 0 else 0
 
             # Update all fresh metadata
@@ -274,8 +377,8 @@ class VideoProcessor:
                 "like_count": metadata.like_count,
                 "comment_count": metadata.comment_count,
                 "view_velocity": view_velocity,
-                "updated_at": datetime.now(UTC),
-                "last_seen_at": datetime.now(UTC),
+                "updated_at": now,
+                "last_seen_at": now,
             })
 
             # Needs rescore if views increased significantly (>10% or >1000 views)
@@ -295,48 +398,88 @@ class VideoProcessor:
             # On error, treat as new video
             return (False, False)
 
-    def _load_ip_configs_cached(self) -> list[dict[str, Any]]:
+    def _load_ip_configs_cached(self) -> IpMatcher:
         """
         Load IP configs from Firestore with in-memory caching.
 
         Cache is refreshed every 5 minutes to avoid network calls on every video.
+        Once filled, an expired cache is served stale while a background thread
+        refreshes it, so only the very first load blocks.
 
         Returns:
-            List of IP config dicts with id, search_keywords, and characters
+            (prefilter, patterns) tuple; prefilter is None when no patterns are configured
         """
-        global _ip_configs_cache, _ip_configs_cache_time
-
-        now = datetime.now(UTC)
+        global _ip_refresh_in_progress
 
         # Return cached configs if still fresh
         if (_ip_configs_cache is not None and
             _ip_configs_cache_time is not None and
-            (now - _ip_configs_cache_time).total_seconds() < _IP_CACHE_TTL_SECONDS):
+            (datetime.now(UTC) - _ip_configs_cache_time).total_seconds() < _IP_CACHE_TTL_SECONDS):
             return _ip_configs_cache
 
-        # Refresh cache
+        # Cold cache: load synchronously
+        if _ip_configs_cache is None:
+            return self._refresh_ip_configs()
+
+        # Expired: serve stale, refresh in the background (one refresh at a time)
+        with _ip_refresh_lock:
+            start_refresh = not _ip_refresh_in_progress
+            _ip_refresh_in_progress = True
+        if start_refresh:
+            threading.Thread(
+                target=self._refresh_ip_configs_in_background,
+                name="ip-configs-refresh",
+                daemon=True,
+            ).start()
+        return _ip_configs_cache
+
+    def _refresh_ip_configs_in_background(self):
+        """Refresh the IP configs cache, then allow the next refresh."""
+        global _ip_refresh_in_progress
         try:
+            self._refresh_ip_configs()
+        finally:
+            with _ip_refresh_lock:
+                _ip_refresh_in_progress = False
+
+    def _refresh_ip_configs(self) -> IpMatcher:
+        """
+        Read IP configs from Firestore into the cache.
+
+        Returns:
+            Fresh (prefilter, patterns), or the stale cache (empty matcher if none) on error
+        """
+        global _ip_configs_cache, _ip_configs_cache_time
+
+        try:
+            now = datetime.now(UTC)
             docs = self.firestore.collection("ip_configs").stream()
-            configs = []
+            patterns = []
+            config_count = 0
 
             for doc in docs:
                 data = doc.to_dict()
-                configs.append({
-                    "id": doc.id,
-                    "search_keywords": data.get("search_keywords", []),
-                    "characters": data.get("characters", []),
-                })
-
-            _ip_configs_cache = configs
+                config_count += 1
+                # Lowercase once per refresh, not once per video
+                for pattern in (*data.get("search_keywords", []), *data.get("characters", [])):
+                    patterns.append((pattern.lower(), doc.id))
+
+            prefilter = (
+                re.compile("|".join(re.escape(pattern) for pattern, _ in patterns))
+                if patterns else None
+            )
+            matcher = (prefilter, tuple(patterns))
+            # Single assignment: readers see either the old or the new matcher
+            _ip_configs_cache = matcher
             _ip_configs_cache_time = now
-            logger.info(f"Loaded {len(configs)} IP configs into cache")
+            logger.info(f"Loaded {config_count} IP configs into cache")
 
-            return configs
+            return matcher
 
         except Exception as e:
             logger.error(f"Error loading IP configs: {e}")
-            # Return stale cache if available, otherwise empty list
-            return _ip_configs_cache if _ip_configs_cache else []
+            # Return stale cache if available, otherwise an empty matcher
+            return _ip_configs_cache if _ip_configs_cache is not None else _EMPTY_IP_MATCHER
 
     def match_ips(self, metadata: VideoMetadata) -> list[str]:
         """
@@ -357,29 +500,27 @@ class VideoProcessor:
             List of matched IP IDs (e.g., ["dc-universe"])
         """
         try:
-            # Load IP configs from cache (fast!)
-            configs = self._load_ip_configs_cached()
+            # Refresh IP configs cache if needed (fast!); one snapshot for this video
+            prefilter, patterns = self._load_ip_configs_cached()
+
+            # One join over all fields (tags included) - no separate joined-tags string
+            search_text = " ".join(
+                (metadata.title, metadata.description, *metadata.tags, metadata.channel_title)
+            ).lower()
+
+            # Most videos match nothing: one regex scan rules them out
+            if prefilter is None or not prefilter.search(search_text):
+                return []
 
             matched_ids = []
-            search_text = f"{metadata.title} {metadata.description} {' '.join(metadata.tags)} {metadata.channel_title}".lower()
-
-            for config in configs:
-                keywords = config["search_keywords"]
-                characters = config["characters"]
-                ip_id = config["id"]
-
-                # Match keywords or character names
-                for keyword in keywords:
-                    if keyword.lower() in search_text:
-                        matched_ids.append(ip_id)
-                        break
-
-                # Also check character names if no keyword match
-                if ip_id not in matched_ids:
-                    for char in characters:
-                        if char.lower() in search_text:
-                            matched_ids.append(ip_id)
-                            break
+
+            # One flat loop over keywords and character names (pre-lowercased,
+            # grouped by config so an IP's remaining patterns are skipped once it matches)
+            for pattern, ip_id in patterns:
+                if matched_ids and matched_ids[-1] == ip_id:
+                    continue
+                if pattern in search_text:
+                    matched_ids.append(ip_id)
 
             return matched_ids
 
@@ -402,14 +543,71 @@ class VideoProcessor:
         Returns:
             Channel risk score (0-100), default 40 for unknown channels
         """
+        cached = _cached_channel_risk(channel_id)
+        if cached is not None:
+            return cached
+
         try:
             doc_ref = self.firestore.collection("channels").document(channel_id)
-            doc = doc_ref.get()
+            risk = self._score_channel_risk(doc_ref.get())
+            _remember_channel_risk(channel_id, risk, time.monotonic())
+            return risk
 
-            if not doc.exists:
-                # Unknown channel = assume risky (GUILTY UNTIL PROVEN INNOCENT)
-                return 40
+        except Exception as e:
+            logger.error(f"Error getting channel risk for {channel_id}: {e}")
+            return 40  # Default to risky on error
+
+    def _get_channel_risks(self, channel_ids: list[str]) -> dict[str, int]:
+        """
+        Get risk scores for several channels with one get_all call.
 
+        Channels with a fresh cached score are not read again.
+
+        Args:
+            channel_ids: YouTube channel IDs (duplicates are read once)
+
+        Returns:
+            Dict mapping channel_id → risk score (channels missing after a failed
+            bulk read are left out, so callers fall back to _get_channel_risk)
+        """
+        risks = {}
+        to_fetch = []
+        for channel_id in dict.fromkeys(channel_ids):
+            cached = _cached_channel_risk(channel_id)
+            if cached is None:
+                to_fetch.append(channel_id)
+            else:
+                risks[channel_id] = cached
+        if not to_fetch:
+            return risks
+
+        collection = self.firestore.collection("channels")
+        try:
+            snapshots = self.firestore.get_all([collection.document(cid) for cid in to_fetch])
+            fetched_at = time.monotonic()
+            for snapshot in snapshots:
+                risk = self._score_channel_risk(snapshot)
+                risks[snapshot.id] = risk
+                _remember_channel_risk(snapshot.id, risk, fetched_at)
+        except Exception as e:
+            logger.error(f"Error getting channel risk for {len(to_fetch)} channels: {e}")
+        return risks
+
+    def _score_channel_risk(self, doc: firestore.DocumentSnapshot) -> int:
+        """
+        Score a channel document (see _get_channel_risk for the heuristic).
+
+        Args:
+            doc: Channel document snapshot
+
+        Returns:
+            Channel risk score (0-100), 40 for unknown channels
+        """
+        if not doc.exists:
+            # Unknown channel = assume risky (GUILTY UNTIL PROVEN INNOCENT)
+            return 40
+
+        try:
             channel_data = doc.to_dict()
 
             # Calculate simple risk based on infringement history
@@ -439,10 +637,12 @@ class VideoProcessor:
                 return 10  # Proven clean
 
         except Exception as e:
-            logger.error(f"Error getting channel risk for {channel_id}: {e}")
+            logger.error(f"Error getting channel risk for {doc.id}: {e}")
             return 40  # Default to risky on error
 
-    def calculate_initial_risk(self, metadata: VideoMetadata, channel_risk: int) -> int:
+    def calculate_initial_risk(
+        self, metadata: VideoMetadata, channel_risk: int, now: datetime | None = None
+    ) -> int:
         """
         Calculate initial risk score (0-100) for newly discovered video.
 
@@ -456,6 +656,7 @@ class VideoProcessor:
         Args:
             metadata: Video metadata to analyze
             channel_risk: Channel's current risk score (0-100)
+            now: Current time for the age factor (defaults to now)
 
         Returns:
             Risk score from 0-100
@@ -484,7 +685,7 @@ class VideoProcessor:
             risk += 5
 
         # Factor 5: Recent videos get priority
-        age_days = (datetime.now(UTC) - metadata.published_at).days
+        age_days = ((now or datetime.now(UTC)) - metadata.published_at).days
         if age_days <= 7:
             risk += 5
         elif age_days <= 30:
@@ -509,86 +710,109 @@ class VideoProcessor:
         Returns:
             Risk tier string
         """
-        if risk_score >= 80:
-            return "CRITICAL"
-        elif risk_score >= 60:
-            return "HIGH"
-        elif risk_score >= 40:
-            return "MEDIUM"
-        elif risk_score >= 20:
-            return "LOW"
-        else:
-            return "VERY_LOW"
+        return _RISK_TIERS[max(0, min(risk_score, 100))]
 
-    def save_and_publish(self, metadata: VideoMetadata) -> bool:
-        """
-        Atomically save to Firestore and publish to PubSub.
+    def _ensure_channel_profile(self, metadata: VideoMetadata):
+        """Create/update the channel profile if a channel tracker is available."""
+        if self.channel_tracker:
+            try:
+                self.channel_tracker.get_or_create_profile(
+                    channel_id=metadata.channel_id,
+                    channel_title=metadata.channel_title
+                )
+            except Exception as e:
+                logger.warning(f"Failed to create channel profile for {metadata.channel_id}: {e}")
+                # Don't fail the whole operation if channel profile fails
 
-        Operations:
-        1. Create/update channel profile
-        2. Save video document to Firestore
-        3. Publish video message to PubSub
+    def _save_videos(self, videos: list[VideoMetadata], now: datetime | None = None) -> bool:
+        """
+        Save new videos and their stats increments in one Firestore batch commit.
 
-        Both operations must succeed. If either fails, logs error
-        but doesn't raise (allows processing to continue).
+        Writes one document per video, one channel stats update per channel,
+        and a single hourly and global counter increment for the whole batch.
 
         Args:
-            metadata: Video metadata to persist
+            videos: New videos to persist (at most MAX_VIDEOS_PER_WRITE_BATCH)
+            now: Timestamp for discovered_at/updated_at and stats (defaults to now)
 
         Returns:
-            True if both operations succeeded, False otherwise
+            True if the batch committed, False otherwise
         """
-        try:
-            # Create/update channel profile if channel_tracker available
-            if self.channel_tracker:
-                try:
-                    self.channel_tracker.get_or_create_profile(
-                        channel_id=metadata.channel_id,
-                        channel_title=metadata.channel_title
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to create channel profile for {metadata.channel_id}: {e}")
-                    # Don't fail the whole operation if channel profile fails
-
-            # Save video document (single write - no stats updates in hot path)
+        now = now or datetime.now(UTC)
+        batch = self.firestore.batch()
+
+        by_channel: dict[str, list[VideoMetadata]] = {}
+        for metadata in videos:
             doc_ref = self.firestore.collection(self.videos_collection).document(
                 metadata.video_id
             )
-
-            video_doc = {
+            batch.set(doc_ref, {
                 **metadata.model_dump(),
                 "status": VideoStatus.DISCOVERED.value,
-                "discovered_at": datetime.now(UTC),
-                "updated_at": datetime.now(UTC),
-                "vision_triggered_at": datetime.now(UTC),  # Mark as triggered immediately for new videos
-            }
+                "discovered_at": now,
+                "updated_at": now,
+                "vision_triggered_at": now,  # Mark as triggered immediately for new videos
+            })
+            by_channel.setdefault(metadata.channel_id, []).append(metadata)
+
+        # Hourly discoveries, channel stats (video count, views, etc.) and global video count
+        stat_writes = [self._hourly_stat_write("discoveries", len(videos), now)]
+        stat_writes.extend(
+            self._channel_stats_write(channel_videos, now) for channel_videos in by_channel.values()
+        )
+        stat_writes.append(self._global_stat_write("total_videos", len(videos)))
+        for stats_ref, data in stat_writes:
+            batch.set(stats_ref, data, merge=True)
 
-            doc_ref.set(video_doc)
-            logger.info(f"Saved video {metadata.video_id} to Firestore")
+        try:
+            batch.commit()
+        except Exception as e:
+            logger.error(f"Failed to save {len(videos)} videos to Firestore: {e}")
+            return False
 
-            # Increment hourly discoveries counter
-            self._increment_hourly_stat("discoveries")
+        for metadata in videos:
+            logger.info("Saved video %s to Firestore", metadata.video_id)
+        return True
 
-            # Update channel stats (video count, views, etc.)
-            self._update_channel_stats(metadata)
+    def publish_discovered_video(self, metadata: VideoMetadata):
+        """
+        Publish a video message to PubSub without waiting for confirmation.
 
-            # Increment global video count
-            self._increment_global_stat("total_videos", 1)
+        Args:
+            metadata: Video metadata to publish
+        """
+        message_data = VIDEO_MESSAGE_ADAPTER.dump_json(metadata)
+        future = self.publisher.publish(self.topic_path, message_data)
 
-            # Publish to PubSub (non-blocking - don't wait for confirmation)
-            message_data = metadata.model_dump_json().encode("utf-8")
-            future = self.publisher.publish(self.topic_path, message_data)
+        # Add callback for logging (async, won't block)
+        future.add_done_callback(functools.partial(_log_publish_result, metadata.video_id))
 
-            # Add callback for logging (async, won't block)
-            def log_publish_result(f):
-                try:
-                    message_id = f.result()
-                    logger.info(f"Published video {metadata.video_id} to PubSub: {message_id}")
-                except Exception as e:
-                    logger.error(f"Failed to publish video {metadata.video_id}: {e}")
+    def save_and_publish(self, metadata: VideoMetadata, now: datetime | None = None) -> bool:
+        """
+        Atomically save to Firestore and publish to PubSub.
 
-            future.add_done_callback(log_publish_result)
+        Operations:
+        1. Create/update channel profile
+        2. Save video document and stats increments to Firestore (one batch commit)
+        3. Publish video message to PubSub
+
+        Both operations must succeed. If either fails, logs error
+        but doesn't raise (allows processing to continue).
 
+        Args:
+            metadata: Video metadata to persist
+            now: Timestamp for the video and stats writes (defaults to now)
+
+        Returns:
+            True if both operations succeeded, False otherwise
+        """
+        try:
+            self._ensure_channel_profile(metadata)
+
+            if not self._save_videos([metadata], now):
+                return False
+
+            self.publish_discovered_video(metadata)
             return True
 
         except Exception as e:
@@ -606,10 +830,10 @@ class VideoProcessor:
 
         Pipeline:
         1. Extract metadata from all videos
-        2. Filter duplicates (optional)
+        2. Filter duplicates (optional, one bulk read for the batch)
         3. Match IPs
         4. Filter videos with no IP matches (optional)
-        5. Save to Firestore + publish to PubSub
+        5. Save to Firestore (batched commits) + publish to PubSub
 
         Args:
             video_data_list: Raw video data from YouTube API
@@ -623,20 +847,55 @@ class VideoProcessor:
             return []
 
         processed = []
+        new_videos = []
         skipped_duplicate = 0
         skipped_no_match = 0
         errors = 0
 
         logger.info(f"Processing batch of {len(video_data_list)} videos")
 
+        # One timestamp for the whole batch (updates, risk ages and new-video writes)
+        now = datetime.now(UTC)
+
+        # Extract metadata (a video repeated within the batch is only processed once)
+        videos = []
+        seen_ids = set()
         for video_data in video_data_list:
             try:
-                # Extract metadata
                 metadata = self.extract_metadata(video_data)
+                if metadata.video_id in seen_ids:
+                    skipped_duplicate += 1
+                    continue
+                seen_ids.add(metadata.video_id)
+                videos.append(metadata)
+            except Exception as e:
+                logger.error(f"Error processing video: {e}")
+                errors += 1
 
-                # Check if existing video (duplicate = good! means we can track virality)
-                is_existing, needs_rescore = self.update_if_existing(metadata)
-
+        # Look up every video's stored document in one round trip
+        existing = self._get_existing_videos(videos)
+
+        # Prefetch risk for the channels of new videos (many results share a channel)
+        channel_risks = self._get_channel_risks([
+            v.channel_id for v in videos
+            if existing is None or v.video_id not in existing or not existing[v.video_id].exists
+        ])
+
+        # Check/update existing videos concurrently (duplicate = good! means we can
+        # track virality). Each update touches its own document, so they are independent.
+        def check_existing(metadata: VideoMetadata) -> tuple[bool, bool]:
+            snapshot = existing.get(metadata.video_id) if existing is not None else None
+            return self.update_if_existing(metadata, snapshot, now)
+
+        with ThreadPoolExecutor(
+            max_workers=EXISTING_VIDEO_UPDATE_WORKERS, thread_name_prefix="video-update"
+        ) as pool:
+            existing_checks = list(pool.map(check_existing, videos))
+
+        # New videos are handled in order: channel profiles for the same new
+        # channel must not be created concurrently
+        for metadata, (is_existing, needs_rescore) in zip(videos, existing_checks):
+            try:
                 if is_existing:
                     # Already exists - metadata updated, check if needs priority rescore
                     if needs_rescore:
@@ -660,27 +919,40 @@ class VideoProcessor:
                 metadata.matched_ips = matched_ips
 
                 # Calculate initial risk score with actual channel risk
-                channel_risk = self._get_channel_risk(metadata.channel_id)
-                metadata.initial_risk = self.calculate_initial_risk(metadata, channel_risk)
+                channel_risk = channel_risks.get(metadata.channel_id)
+                if channel_risk is None:
+                    channel_risk = self._get_channel_risk(metadata.channel_id)
+                metadata.initial_risk = self.calculate_initial_risk(metadata, channel_risk, now)
                 metadata.current_risk = metadata.initial_risk  # Initially same
                 metadata.risk_tier = self.calculate_risk_tier(metadata.initial_risk)
 
                 logger.debug(
-                    f"Video {metadata.video_id}: risk={metadata.initial_risk}, "
-                    f"tier={metadata.risk_tier}"
+                    "Video %s: risk=%s, tier=%s",
+                    metadata.video_id, metadata.initial_risk, metadata.risk_tier,
                 )
 
-                # Save and publish
-                if self.save_and_publish(metadata):
-                    processed.append(metadata)
-                else:
-                    errors += 1
+                # Save after the loop (batched commits), then publish
+                self._ensure_channel_profile(metadata)
+                new_videos.append(metadata)
 
             except Exception as e:
                 logger.error(f"Error processing video: {e}")
                 errors += 1
                 continue
 
+        for start in range(0, len(new_videos), MAX_VIDEOS_PER_WRITE_BATCH):
+            chunk = new_videos[start:start + MAX_VIDEOS_PER_WRITE_BATCH]
+            try:
+                if not self._save_videos(chunk, now):
+                    errors += len(chunk)
+                    continue
+                for metadata in chunk:
+                    self.publish_discovered_video(metadata)
+                processed.extend(chunk)
+            except Exception as e:
+                logger.error(f"Failed to save/publish {len(chunk)} videos: {e}")
+                errors += len(chunk)
+
         logger.info(
             f"Batch complete: {len(processed)} processed, "
             f"{skipped_duplicate} duplicates, "
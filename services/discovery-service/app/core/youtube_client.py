@@ -19,10 +19,22 @@ class YouTubeClient:
     def __init__(self, api_key: str):
         """Initialize YouTube client with single API key."""
         self.api_key = api_key
+        self._service: Any = None
 
     def _build_youtube_service(self) -> Any:
-        """Build YouTube API service."""
-        return build("youtube", "v3", developerKey=self.api_key, cache_discovery=False)
+        """
+        Get the YouTube API service, building it on first use.
+
+        The service (and its HTTP connection) is reused by every call on this
+        client. It is built from the discovery document bundled with the
+        library, so no discovery fetch happens.
+        """
+        if self._service is None:
+            self._service = build(
+                "youtube", "v3", developerKey=self.api_key,
+                cache_discovery=False, static_discovery=True,
+            )
+        return self._service
 
     def search_videos(
         self,
@@ -73,12 +73,30 @@ async def startup_event() -> None:
         },
     )
 
+    # Create the async Firestore client on the serving event loop
+    discover.get_async_firestore_client()
+
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     """Run on application shutdown."""
     logger.info(f"Shutting down {settings.service_name}")
 
+    # Drain background quota writes and persist usage still buffered in memory
+    if discover._quota_manager_cache is not None:
+        discover._quota_manager_cache.close()
+
+    # Commit search history records still buffered in memory
+    if discover._search_history_cache is not None:
+        await discover._search_history_cache.flush()
+
+    if discover._async_firestore_client_cache is not None:
+        discover._async_firestore_client_cache.close()
+
+    # Send discovered-video messages still waiting in the publisher's batch
+    if discover._pubsub_publisher_cache is not None:
+        discover._pubsub_publisher_cache.stop()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -16,12 +16,32 @@ from ..core.search_randomizer import SearchRandomizer
 from ..core.search_history import SearchHistory
 from ..core.video_processor import VideoProcessor
 from ..core.youtube_client import YouTubeClient
+from app.utils.firestore_utils import stream_in_pages
 from app.utils.logging_utils import log_exception_json
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/discover", tags=["discovery"])
 
+# Publisher batching for discovered-video messages (max_bytes stays under the 10MB request limit)
+PUBSUB_BATCH_SETTINGS = pubsub_v1.types.BatchSettings(
+    max_messages=1000,
+    max_bytes=9_000_000,
+    max_latency=0.05,
+)
+
+# Fields read by the keyword performance endpoint (projected to shrink payloads)
+KEYWORD_PERFORMANCE_FIELDS = [
+    "keyword",
+    "searched_at",
+    "search_date",
+    "tier",
+    "cooldown_days",
+    "efficiency_pct",
+    "new_videos",
+    "total_results",
+]
+
 
 # ============================================================================
 # Dependency Injection
@@ -35,9 +55,32 @@ def get_firestore_client() -> firestore.Client:
     )
 
 
+def get_async_firestore_client() -> firestore.AsyncClient:
+    """
+    Get async Firestore client (cached singleton).
+
+    Created by the startup event so its gRPC channel belongs to the serving
+    event loop, and closed again on shutdown.
+    """
+    global _async_firestore_client_cache
+    if _async_firestore_client_cache is None:
+        _async_firestore_client_cache = firestore.AsyncClient(
+            project=settings.gcp_project_id, database=settings.firestore_database_id
+        )
+    return _async_firestore_client_cache
+
+
 def get_pubsub_publisher() -> pubsub_v1.PublisherClient:
-    """Get PubSub publisher client."""
-    return pubsub_v1.PublisherClient()
+    """
+    Get PubSub publisher client (cached singleton so its batcher spans requests).
+
+    Batches wait up to 50ms for up to 1000 messages, so a discovery run's
+    publishes go out in a few RPCs instead of one per 100 messages / 10ms.
+    """
+    global _pubsub_publisher_cache
+    if _pubsub_publisher_cache is None:
+        _pubsub_publisher_cache = pubsub_v1.PublisherClient(batch_settings=PUBSUB_BATCH_SETTINGS)
+    return _pubsub_publisher_cache
 
 
 def get_youtube_client() -> YouTubeClient:
@@ -72,6 +115,9 @@ def get_video_processor(
 
 # Cached instances to avoid recreating on every request
 _quota_manager_cache: QuotaManager | None = None
+_search_history_cache: SearchHistory | None = None
+_pubsub_publisher_cache: pubsub_v1.PublisherClient | None = None
+_async_firestore_client_cache: firestore.AsyncClient | None = None
 # Note: SearchRandomizer is NOT cached - needs to pick up config changes from Firestore
 
 
@@ -93,17 +139,25 @@ def get_search_randomizer(
     """
     Get search randomizer (fresh instance each time to pick up config changes).
 
-    Note: No caching here because keywords can be updated in Firestore at any time.
-    Loading keywords is fast (single Firestore query), so recreating is acceptable.
+    Note: No instance caching here because keywords can be updated in Firestore at
+    any time. Collection reads go through a 60s shared cache, so recreating is cheap.
     """
     return SearchRandomizer(firestore_client=firestore_client)
 
 
 def get_search_history(
-    firestore_client: firestore.Client = Depends(get_firestore_client),
+    async_firestore_client: firestore.AsyncClient = Depends(get_async_firestore_client),
 ) -> SearchHistory:
-    """Get search history tracker."""
-    return SearchHistory(firestore_client=firestore_client)
+    """
+    Get search history tracker (cached singleton so its recent-search cache persists).
+
+    Uses the async Firestore client so history lookups and writes do not block
+    the event loop during a discovery run.
+    """
+    global _search_history_cache
+    if _search_history_cache is None:
+        _search_history_cache = SearchHistory(firestore_client=async_firestore_client)
+    return _search_history_cache
 
 
 def get_discovery_engine(
@@ -604,13 +658,14 @@ async def get_keyword_performance(
         Keyword performance data grouped by tier
     """
     try:
-        # Get all keyword searches, latest per keyword
-        all_searches = (
+        # Get all keyword searches, latest per keyword (projected, 500-doc pages)
+        all_searches = stream_in_pages(
             firestore_client.collection("keyword_searches")
+            .select(KEYWORD_PERFORMANCE_FIELDS)
             .order_by("searched_at", direction="DESCENDING")
-            .stream()
         )
 
+        now = datetime.now(UTC)
         keyword_stats = {}
         seen_keywords = set()
 
@@ -625,7 +680,7 @@ async def get_keyword_performance(
 
             # Calculate days since last search
             searched_at = data.get("searched_at")
-            days_since = (datetime.now(UTC) - searched_at).days if searched_at else 999
+            days_since = (now - searched_at).days if searched_at else 999
 
             # Get cooldown status
             cooldown_days = data.get("cooldown_days", 1)
@@ -0,0 +1,45 @@
+"""Firestore query helpers.
+
+Full-collection reads go through here so they are fetched in bounded pages
+rather than as one unbounded server stream.
+"""
+
+from collections.abc import Iterator
+
+from google.cloud import firestore
+
+# Page size for paged collection scans (Firestore handles 500-doc pages well)
+DEFAULT_PAGE_SIZE = 500
+
+
+def stream_in_pages(
+    query: firestore.Query,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterator[firestore.DocumentSnapshot]:
+    """
+    Stream a query page by page, resuming each page after the last document.
+
+    Each page is a separate bounded RPC, so a long scan never holds one
+    stream open for the whole collection and a retry only repeats one page.
+
+    Args:
+        query: Ordered Firestore query (any select/where/order_by applied)
+        page_size: Documents fetched per RPC (default: 500)
+
+    Yields:
+        Document snapshots in query order
+    """
+    last_doc = None
+    while True:
+        page = query.limit(page_size)
+        if last_doc is not None:
+            page = page.start_after(last_doc)
+
+        fetched = 0
+        for doc in page.stream():
+            fetched += 1
+            last_doc = doc
+            yield doc
+
+        if fetched < page_size:
+            return
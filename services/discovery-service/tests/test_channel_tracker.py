@@ -4,6 +4,8 @@ import pytest
 from datetime import datetime, timedelta, UTC
 from unittest.mock import MagicMock
 
+from google.cloud.firestore_v1 import Increment
+
 from app.core.channel_tracker import ChannelTracker
 from app.models import ChannelProfile
 
@@ -102,6 +104,58 @@ class TestGetOrCreateProfile:
         doc_ref.set.assert_called_once()
 
 
+class TestExistingProfileUpdate:
+    """Tests for the update payload written for an already-known channel."""
+
+    @pytest.fixture
+    def tracker(self, mock_firestore):
+        """ChannelTracker with the current constructor arguments."""
+        return ChannelTracker(firestore_client=mock_firestore)
+
+    def _existing(self, mock_firestore, data: dict) -> MagicMock:
+        """Serve an existing channel doc and return its document ref."""
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        doc_ref.get.return_value.exists = True
+        doc_ref.get.return_value.to_dict.return_value = data
+        return doc_ref
+
+    def test_unchanged_title_not_rewritten(self, tracker, mock_firestore):
+        """Test an unchanged channel only gets the count increment and last_seen_at."""
+        doc_ref = self._existing(mock_firestore, {
+            "channel_title": "Test Channel", "last_seen_at": datetime.now(UTC) - timedelta(hours=1),
+        })
+
+        tracker.get_or_create_profile("UC_test", "Test Channel")
+
+        payload = doc_ref.update.call_args[0][0]
+        assert set(payload) == {"video_count", "last_seen_at"}
+        assert payload["video_count"] == Increment(1)
+
+    def test_changed_title_written(self, tracker, mock_firestore):
+        """Test a renamed channel also gets its new title."""
+        doc_ref = self._existing(mock_firestore, {
+            "channel_title": "Old Name", "last_seen_at": datetime.now(UTC) - timedelta(hours=1),
+        })
+
+        tracker.get_or_create_profile("UC_test", "New Name")
+
+        payload = doc_ref.update.call_args[0][0]
+        assert set(payload) == {"video_count", "last_seen_at", "channel_title"}
+        assert payload["channel_title"] == "New Name"
+
+    def test_last_seen_at_always_refreshed(self, tracker, mock_firestore):
+        """Test last_seen_at is rewritten however recently the channel was last seen."""
+        before = datetime.now(UTC)
+        for last_seen_at in (None, before - timedelta(days=1), before - timedelta(seconds=5)):
+            doc_ref = self._existing(mock_firestore, {
+                "channel_title": "Test Channel", "last_seen_at": last_seen_at,
+            })
+
+            tracker.get_or_create_profile("UC_test", "Test Channel")
+
+            assert doc_ref.update.call_args[0][0]["last_seen_at"] >= before
+
+
 class TestCalculateRiskScore:
     """Tests for calculate_risk_score method."""
 
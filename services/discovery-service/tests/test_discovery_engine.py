@@ -1,10 +1,13 @@
 """Tests for DiscoveryEngine."""
 
+import asyncio
+
 import pytest
 from datetime import datetime, timedelta
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from app.core.discovery_engine import DiscoveryEngine
+from app.core.search_randomizer import SearchOrder, SearchParams
 from app.models import ChannelProfile, VideoMetadata
 
 
@@ -621,3 +624,75 @@ class TestQuotaRespected:
 
         # Verify: keyword search stopped when quota exhausted
         assert mock_youtube_client.search_videos.call_count <= 2
+
+
+class TestBatchVisionTrigger:
+    """Tests for publishing unscanned videos to the scan-ready topic."""
+
+    @pytest.fixture
+    def engine(self, mock_youtube_client, mock_video_processor, mock_quota_manager):
+        """Engine wired with the current constructor arguments."""
+        return DiscoveryEngine(
+            youtube_client=mock_youtube_client,
+            video_processor=mock_video_processor,
+            quota_manager=mock_quota_manager,
+            search_randomizer=MagicMock(),
+        )
+
+    async def test_publishes_all_before_waiting(self, engine, mock_video_processor):
+        """Test every message is handed to the publisher before any publish is awaited."""
+        docs = []
+        for video_id in ("vid_a", "vid_b", "vid_c"):
+            doc = MagicMock()
+            doc.to_dict.return_value = {"video_id": video_id, "scan_priority": 70}
+            docs.append(doc)
+        query = mock_video_processor.firestore.collection.return_value.where.return_value
+        query.order_by.return_value.limit.return_value.stream.return_value = iter(docs)
+
+        events = []
+        publisher = mock_video_processor.publisher
+
+        def publish(topic, data):
+            events.append("publish")
+            future = MagicMock()
+            future.result.side_effect = lambda: events.append("wait")
+            return future
+
+        publisher.publish.side_effect = publish
+
+        await engine._trigger_batch_vision_analysis(limit=3)
+
+        assert events == ["publish"] * 3 + ["wait"] * 3
+
+
+class TestSearchHistoryFlush:
+    """Tests for committing buffered search history when a run ends early."""
+
+    async def test_flushes_when_run_is_cancelled(
+        self, mock_youtube_client, mock_video_processor, mock_quota_manager
+    ):
+        """Test records buffered before a cancellation are still committed."""
+        randomizer = MagicMock()
+        randomizer.get_daily_search_plan.return_value = [
+            SearchParams(
+                query="superman ai",
+                order=SearchOrder.DATE,
+                published_after="2025-01-01T00:00:00Z",
+                published_before="2025-02-01T00:00:00Z",
+            ),
+        ]
+        search_history = MagicMock()
+        search_history.should_search = AsyncMock(side_effect=asyncio.CancelledError)
+        search_history.flush = AsyncMock()
+        engine = DiscoveryEngine(
+            youtube_client=mock_youtube_client,
+            video_processor=mock_video_processor,
+            quota_manager=mock_quota_manager,
+            search_randomizer=randomizer,
+            search_history=search_history,
+        )
+
+        with pytest.raises(asyncio.CancelledError):
+            await engine.discover(max_quota=1_000)
+
+        search_history.flush.assert_awaited_once()
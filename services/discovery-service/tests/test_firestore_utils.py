@@ -0,0 +1,44 @@
+"""Tests for Firestore query helpers."""
+
+from unittest.mock import MagicMock
+
+from app.utils.firestore_utils import stream_in_pages
+
+
+def _paged_query(pages: list[list[str]]) -> MagicMock:
+    """Build a mock query whose successive pages yield the given doc ids."""
+    query = MagicMock()
+    page_query = query.limit.return_value
+    page_query.start_after.return_value = page_query
+    page_query.stream.side_effect = [iter(page) for page in pages]
+    return query
+
+
+class TestStreamInPages:
+    """Tests for stream_in_pages."""
+
+    def test_yields_all_pages_in_order(self):
+        """Test documents from every page are yielded in order."""
+        query = _paged_query([["a", "b"], ["c", "d"], ["e"]])
+
+        docs = list(stream_in_pages(query, page_size=2))
+
+        assert docs == ["a", "b", "c", "d", "e"]
+        query.limit.assert_called_with(2)
+
+    def test_resumes_after_last_document(self):
+        """Test each page after the first starts after the previous page's last doc."""
+        query = _paged_query([["a", "b"], ["c"]])
+
+        list(stream_in_pages(query, page_size=2))
+
+        query.limit.return_value.start_after.assert_called_once_with("b")
+
+    def test_stops_on_empty_page(self):
+        """Test an exactly-full last page ends on the following empty page."""
+        query = _paged_query([["a", "b"], []])
+
+        docs = list(stream_in_pages(query, page_size=2))
+
+        assert docs == ["a", "b"]
+        assert query.limit.return_value.stream.call_count == 2
@@ -1,9 +1,14 @@
 """Tests for QuotaManager class."""
 
+import threading
+import time
+
 import pytest
-from datetime import datetime
+from datetime import datetime, UTC
 from unittest.mock import MagicMock
 
+from google.cloud import firestore, monitoring_v3
+
 from app.core.quota_manager import QuotaManager
 
 
@@ -16,11 +21,14 @@ def mock_firestore():
 @pytest.fixture
 def quota_manager(mock_firestore):
     """QuotaManager instance with mocked Firestore."""
-    return QuotaManager(
+    manager = QuotaManager(
         firestore_client=mock_firestore,
         daily_quota=10_000,
         quota_collection="quota_usage",
     )
+    manager._startup_reload.join()
+    yield manager
+    manager.close()
 
 
 class TestQuotaManagerInit:
@@ -68,6 +76,72 @@ class TestQuotaManagerInit:
         assert manager.used_quota == 0
 
 
+    def test_initialization_does_not_wait_for_google(self, mock_firestore, monkeypatch):
+        """Test the constructor uses Firestore and syncs with Google in the background."""
+        doc_mock = MagicMock()
+        doc_mock.exists = True
+        doc_mock.to_dict.return_value = {"units_used": 2500}
+        mock_firestore.collection.return_value.document.return_value.get.return_value = doc_mock
+
+        release = threading.Event()
+
+        def slow_fetch(self):
+            release.wait(timeout=5)
+            return 4000
+
+        monkeypatch.setattr(QuotaManager, "fetch_actual_quota_from_google", slow_fetch)
+        monkeypatch.setattr(
+            "app.core.quota_manager.monitoring_v3.MetricServiceClient", MagicMock()
+        )
+
+        manager = QuotaManager(firestore_client=mock_firestore)
+        assert manager.used_quota == 2500
+
+        release.set()
+        manager._startup_reload.join(timeout=5)
+        assert manager.used_quota == 4000
+        manager.close()
+
+    def test_usage_recorded_during_reload_is_kept(self, mock_firestore, monkeypatch):
+        """Test usage recorded while Google is queried is added to Google's figure."""
+        doc_mock = MagicMock()
+        doc_mock.exists = True
+        doc_mock.to_dict.return_value = {"units_used": 2500}
+        mock_firestore.collection.return_value.document.return_value.get.return_value = doc_mock
+
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch(self):
+            fetching.set()
+            release.wait(timeout=5)
+            return 4000
+
+        monkeypatch.setattr(QuotaManager, "fetch_actual_quota_from_google", slow_fetch)
+        monkeypatch.setattr(
+            "app.core.quota_manager.monitoring_v3.MetricServiceClient", MagicMock()
+        )
+
+        manager = QuotaManager(firestore_client=mock_firestore)
+        assert fetching.wait(timeout=5)
+        manager.record_usage("search", count=1)
+
+        release.set()
+        manager._startup_reload.join(timeout=5)
+        assert manager.used_quota == 4100
+        manager.close()
+
+    def test_monitoring_client_created_once(self, quota_manager, monkeypatch):
+        """Test a failed monitoring client creation is not retried."""
+        client_cls = MagicMock(side_effect=Exception("no credentials"))
+        monkeypatch.setattr("app.core.quota_manager.monitoring_v3.MetricServiceClient", client_cls)
+        quota_manager._monitoring_checked = False
+
+        assert quota_manager.monitoring_client is None
+        assert quota_manager.monitoring_client is None
+        client_cls.assert_called_once()
+
+
 class TestGetTodayKey:
     """Tests for _get_today_key method."""
 
@@ -82,6 +156,23 @@ class TestGetTodayKey:
         # Should be parseable as date
         datetime.strptime(today_key, "%Y-%m-%d")
 
+    def test_get_today_key_uses_pacific_day(self, quota_manager):
+        """Test the key follows the Pacific date, not the UTC date."""
+        # 2025-01-15 06:00 UTC is still 2025-01-14 in Pacific Time (PST)
+        assert quota_manager._get_today_key(datetime(2025, 1, 15, 6, 0, tzinfo=UTC)) == "2025-01-14"
+        assert quota_manager._get_today_key(datetime(2025, 1, 15, 8, 0, tzinfo=UTC)) == "2025-01-15"
+
+    def test_get_today_key_rolls_over_at_pacific_midnight(self, quota_manager):
+        """Test the cached key is rebuilt once the Pacific day changes."""
+        assert quota_manager._get_today_key(datetime(2025, 3, 9, 7, 59, tzinfo=UTC)) == "2025-03-08"
+        # Same Pacific day, served from cache
+        assert quota_manager._get_today_key(datetime(2025, 3, 9, 7, 30, tzinfo=UTC)) == "2025-03-08"
+        # Pacific midnight (PST, UTC-8) has passed
+        assert quota_manager._get_today_key(datetime(2025, 3, 9, 8, 0, tzinfo=UTC)) == "2025-03-09"
+        # Day after DST starts is only 23 hours long (PDT, UTC-7)
+        assert quota_manager._get_today_key(datetime(2025, 3, 10, 6, 59, tzinfo=UTC)) == "2025-03-09"
+        assert quota_manager._get_today_key(datetime(2025, 3, 10, 7, 0, tzinfo=UTC)) == "2025-03-10"
+
 
 class TestCanAfford:
     """Tests for can_afford method."""
@@ -172,6 +263,7 @@ class TestRecordUsage:
         quota_manager.used_quota = 0
 
         quota_manager.record_usage("search", count=1)
+        quota_manager.close()  # Wait for the background write
 
         # Should call Firestore set
         doc_ref = mock_firestore.collection.return_value.document.return_value
@@ -181,11 +273,72 @@ class TestRecordUsage:
         call_args = doc_ref.set.call_args
         saved_data = call_args[0][0]
 
-        assert saved_data["units_used"] == 100
+        assert saved_data["units_used"].value == 100  # firestore.Increment
         assert saved_data["daily_quota"] == 10_000
         assert "date" in saved_data
         assert "updated_at" in saved_data
 
+    def test_record_usage_coalesces_writes_within_interval(
+        self, quota_manager, mock_firestore
+    ):
+        """Test usage recorded within the flush interval is coalesced."""
+        quota_manager.used_quota = 0
+
+        quota_manager.record_usage("search", count=1)
+        quota_manager.record_usage("video_details", count=5)
+        quota_manager.record_usage("channel_details", count=2)
+        quota_manager.close()
+
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        increments = [c[0][0]["units_used"].value for c in doc_ref.set.call_args_list]
+        assert len(increments) <= 2  # Background write + final flush at most
+        assert sum(increments) == 107
+        assert quota_manager._pending_units == 0
+
+    def test_record_usage_does_not_wait_for_firestore(
+        self, quota_manager, mock_firestore
+    ):
+        """Test record_usage returns while the Firestore write is still running."""
+        release = threading.Event()
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        doc_ref.set.side_effect = lambda *args, **kwargs: release.wait(timeout=5)
+        quota_manager.used_quota = 0
+
+        quota_manager.record_usage("search", count=1)
+
+        assert quota_manager.used_quota == 100
+        release.set()
+        quota_manager.close()
+        doc_ref.set.assert_called_once()
+
+    def test_flush_writes_buffered_usage_as_increment(
+        self, quota_manager, mock_firestore
+    ):
+        """Test flush persists buffered units synchronously as one increment."""
+        quota_manager.used_quota = 0
+        quota_manager._last_flush = time.monotonic()  # Inside the flush interval
+
+        quota_manager.record_usage("video_details", count=5)
+        quota_manager.record_usage("channel_details", count=2)
+        quota_manager.flush()
+
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        doc_ref.set.assert_called_once()
+        assert doc_ref.set.call_args[0][0]["units_used"].value == 7
+        assert quota_manager._pending_units == 0
+
+    def test_flush_keeps_units_buffered_on_error(self, quota_manager, mock_firestore):
+        """Test failed writes keep units pending for the next flush."""
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        doc_ref.set.side_effect = Exception("Firestore unavailable")
+        quota_manager.used_quota = 0
+
+        quota_manager.record_usage("search", count=1)
+        quota_manager.close()
+
+        assert quota_manager.used_quota == 100
+        assert quota_manager._pending_units == 100
+
     def test_record_usage_logs_warning_at_80_percent(
         self, quota_manager, mock_firestore
     ):
@@ -212,6 +365,63 @@ class TestRecordUsage:
         assert quota_manager._warning_logged is True
 
 
+class TestClose:
+    """Tests for usage recorded after close()."""
+
+    def test_record_usage_after_close_writes_synchronously(self, quota_manager, mock_firestore):
+        """Test usage recorded during shutdown is written on the caller's thread."""
+        quota_manager.used_quota = 0
+        quota_manager.close()
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        doc_ref.set.reset_mock()
+
+        quota_manager.record_usage("search", count=1)
+
+        doc_ref.set.assert_called_once()
+        assert doc_ref.set.call_args[0][0]["units_used"] == firestore.Increment(100)
+
+    def test_reload_usage_after_close_writes_synchronously(self, quota_manager, mock_firestore, monkeypatch):
+        """Test a Google reload after close() saves its figure without the writer thread."""
+        monkeypatch.setattr(QuotaManager, "fetch_actual_quota_from_google", lambda self: 4200)
+        quota_manager.close()
+        doc_ref = mock_firestore.collection.return_value.document.return_value
+        doc_ref.set.reset_mock()
+
+        quota_manager.reload_usage()
+
+        doc_ref.set.assert_called_once()
+        assert doc_ref.set.call_args[0][0]["units_used"] == 4200
+
+
+class TestFetchActualQuotaFromGoogle:
+    """Tests for fetch_actual_quota_from_google method."""
+
+    def test_sums_int_and_double_points(self, quota_manager):
+        """Test points are summed from whichever value field is set."""
+        series = monitoring_v3.TimeSeries(
+            points=[
+                monitoring_v3.Point(value=monitoring_v3.TypedValue(int64_value=100)),
+                monitoring_v3.Point(value=monitoring_v3.TypedValue(double_value=2.5)),
+                monitoring_v3.Point(value=monitoring_v3.TypedValue(int64_value=0)),
+            ]
+        )
+        quota_manager.monitoring_client = MagicMock()
+        quota_manager.monitoring_client.list_time_series.return_value = [series, series]
+
+        assert quota_manager.fetch_actual_quota_from_google() == 205
+
+    def test_falls_back_to_firestore_without_points(self, quota_manager, mock_firestore):
+        """Test Firestore usage is returned when Google reports no points."""
+        doc_mock = MagicMock()
+        doc_mock.exists = True
+        doc_mock.to_dict.return_value = {"units_used": 1234}
+        mock_firestore.collection.return_value.document.return_value.get.return_value = doc_mock
+        quota_manager.monitoring_client = MagicMock()
+        quota_manager.monitoring_client.list_time_series.return_value = []
+
+        assert quota_manager.fetch_actual_quota_from_google() == 1234
+
+
 class TestGetRemaining:
     """Tests for get_remaining method."""
 
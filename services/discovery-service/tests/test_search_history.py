@@ -0,0 +1,481 @@
+"""Tests for SearchHistory class."""
+
+import pytest
+from datetime import datetime, timedelta, UTC
+from unittest.mock import AsyncMock, MagicMock
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore_v1.async_client import AsyncClient
+
+from app.core import search_history as search_history_module
+from app.core.search_history import SearchHistory
+
+
+@pytest.fixture
+def mock_firestore():
+    """Mock async Firestore client with one mock per collection."""
+    client = MagicMock()
+    collections = {}
+    client.collection.side_effect = lambda name: collections.setdefault(name, MagicMock())
+    client.batch.return_value.commit = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def search_history(mock_firestore):
+    """SearchHistory instance with mocked async Firestore (no search state yet)."""
+    history = SearchHistory(firestore_client=mock_firestore)
+    _set_state(history, None)
+    return history
+
+
+def _set_state(history: SearchHistory, state: dict | None) -> None:
+    """Make the search state doc return the given data (None = missing)."""
+    doc = MagicMock()
+    doc.exists = state is not None
+    doc.to_dict.return_value = state
+    history.state_collection.document.return_value.get = AsyncMock(return_value=doc)
+
+
+def _recent_query(history: SearchHistory) -> MagicMock:
+    """Return the mock query that _get_recent_searches streams from."""
+    collection = history.collection
+    return collection.where.return_value.where.return_value.where.return_value.order_by.return_value.limit.return_value.select.return_value
+
+
+def _all_time_probe(history: SearchHistory) -> MagicMock:
+    """Return the mock count aggregation _has_recent_all_time_search runs."""
+    collection = history.collection
+    return collection.where.return_value.where.return_value.where.return_value.where.return_value.limit.return_value.count.return_value
+
+
+def _stream_docs(history: SearchHistory, searches: list[dict]) -> None:
+    """Make the recent-searches queries asynchronously stream the given documents."""
+    docs = []
+    for data in searches:
+        doc = MagicMock()
+        doc.to_dict.return_value = data
+        docs.append(doc)
+    all_time_count = min(1, sum(1 for data in searches if not data["time_window"]))
+
+    def stream_of(items):
+        async def stream():
+            for item in items:
+                yield item
+        return stream
+
+    _recent_query(history).stream.side_effect = stream_of(docs)
+    _all_time_probe(history).get = AsyncMock(return_value=[[MagicMock(value=all_time_count)]])
+
+
+class TestGetRecentSearches:
+    """Tests for _get_recent_searches caching."""
+
+    async def test_repeated_lookup_served_from_cache(self, search_history):
+        """Test a second lookup within the TTL does not query Firestore."""
+        _stream_docs(search_history, [{"results_count": 10, "time_window": None}])
+
+        first = await search_history._get_recent_searches("ai movie", "date")
+        second = await search_history._get_recent_searches("ai movie", "date")
+
+        assert first == second == [{"results_count": 10, "time_window": None}]
+        assert _recent_query(search_history).stream.call_count == 1
+
+    async def test_lookup_projects_used_fields(self, search_history):
+        """Test only the fields read by should_search are fetched."""
+        _stream_docs(search_history, [])
+
+        await search_history._get_recent_searches("ai movie", "date")
+
+        limited = search_history.collection.where.return_value.where.return_value.where.return_value.order_by.return_value.limit.return_value
+        limited.select.assert_called_once_with(
+            ["results_count", "time_window", "searched_at", "searched_at_epoch"]
+        )
+
+    async def test_expired_entry_is_refetched(self, search_history, monkeypatch):
+        """Test entries older than the TTL are fetched again."""
+        _stream_docs(search_history, [])
+        monkeypatch.setattr(search_history_module.time, "monotonic", lambda: 1000.0)
+        await search_history._get_recent_searches("ai movie", "date")
+
+        monkeypatch.setattr(
+            search_history_module.time,
+            "monotonic",
+            lambda: 1000.0 + search_history_module.RECENT_SEARCHES_CACHE_TTL_SECONDS,
+        )
+        await search_history._get_recent_searches("ai movie", "date")
+
+        assert _recent_query(search_history).stream.call_count == 2
+
+    async def test_cache_is_bounded(self, search_history, monkeypatch):
+        """Test the least recently used entry is evicted past the size limit."""
+        monkeypatch.setattr(search_history_module, "RECENT_SEARCHES_CACHE_SIZE", 2)
+        _stream_docs(search_history, [])
+
+        await search_history._get_recent_searches("a", "date")
+        await search_history._get_recent_searches("b", "date")
+        await search_history._get_recent_searches("a", "date")  # Refresh "a"
+        await search_history._get_recent_searches("c", "date")
+
+        assert list(search_history._recent_cache) == [("a", "date"), ("c", "date")]
+
+
+    async def test_all_time_probe_is_capped_count(self, search_history):
+        """Test the all-time check is a count aggregation capped at one match."""
+        _stream_docs(search_history, [{"results_count": 10, "time_window": None}])
+
+        assert await search_history._has_recent_all_time_search("ai movie", "date") is True
+        search_history.collection.where.return_value.where.return_value.where.return_value.where.return_value.limit.assert_called_once_with(1)
+
+    async def test_windowed_history_triggers_all_time(self, search_history):
+        """Test history without an all-time search leads to one."""
+        window = {"published_after": "2025-01-01T00:00:00Z", "published_before": "2025-01-31T23:59:59Z"}
+        _stream_docs(
+            search_history,
+            [{"results_count": 10, "time_window": window, "searched_at": datetime.now(UTC)}],
+        )
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert time_window is None
+
+
+class TestRecordSearch:
+    """Tests for record_search and flush."""
+
+    async def test_record_search_invalidates_cache(self, search_history, mock_firestore):
+        """Test a recorded search is visible to the next lookup."""
+        _stream_docs(search_history, [])
+        await search_history._get_recent_searches("ai movie", "date")
+
+        await search_history.record_search("ai movie", "date", results_count=5)
+        await search_history.should_search("ai movie", "date")
+        await search_history._get_recent_searches("ai movie", "date")
+
+        assert _recent_query(search_history).stream.call_count == 2
+        # Pending record for this keyword+order was committed before the query
+        batch = mock_firestore.batch.return_value
+        batch.commit.assert_awaited_once()
+        saved = batch.set.call_args_list[0][0][1]
+        assert saved["keyword"] == "ai movie"
+        assert saved["results_count"] == 5
+        assert isinstance(saved["searched_at"], datetime)
+        assert saved["searched_at"].tzinfo == UTC
+
+    async def test_records_committed_in_one_batch(self, search_history, mock_firestore):
+        """Test buffered records are written with a single batch commit."""
+        await search_history.record_search("ai movie", "date", results_count=5)
+        await search_history.record_search("ai movie", "viewCount", results_count=7)
+        await search_history.record_search("sora", "date", results_count=3)
+
+        batch = mock_firestore.batch.return_value
+        batch.commit.assert_not_awaited()
+
+        await search_history.flush()
+
+        batch.commit.assert_awaited_once()
+        assert batch.set.call_count == 6  # History record + search state per search
+        assert search_history._pending_count == 0
+
+    async def test_record_doc_id_is_deterministic(self, search_history):
+        """Test replaying a record targets the same document, merged."""
+        window = {"published_after": "2025-01-01T00:00:00Z", "published_before": "2025-01-31T23:59:59Z"}
+
+        await search_history.record_search("ai movie", "date", results_count=5, time_window=window)
+        await search_history.record_search("ai movie", "date", results_count=5, time_window=window)
+        await search_history.record_search("ai movie", "date", results_count=5)
+
+        doc_ids = [c[0][0] for c in search_history.collection.document.call_args_list]
+        assert doc_ids[0] == doc_ids[1]
+        assert doc_ids[2] != doc_ids[0]
+        await search_history.flush()
+        assert all(c.kwargs["merge"] for c in search_history.db.batch.return_value.set.call_args_list)
+
+    async def test_auto_flush_at_batch_size(self, search_history, mock_firestore, monkeypatch):
+        """Test the buffer is committed once it reaches the batch size."""
+        monkeypatch.setattr(search_history_module, "WRITE_BATCH_SIZE", 4)
+
+        await search_history.record_search("a", "date", results_count=1)
+        mock_firestore.batch.return_value.commit.assert_not_awaited()
+        await search_history.record_search("b", "date", results_count=1)
+
+        mock_firestore.batch.return_value.commit.assert_awaited_once()
+        assert search_history._pending_count == 0
+
+    async def test_failed_flush_keeps_records(self, search_history, mock_firestore):
+        """Test records stay buffered when the batch commit fails."""
+        mock_firestore.batch.return_value.commit.side_effect = Exception("unavailable")
+
+        await search_history.record_search("ai movie", "date", results_count=5)
+        await search_history.flush()
+
+        assert search_history._pending_count == 2
+        assert ("ai movie", "date") in search_history._pending_writes
+
+    async def test_retry_after_failure_stays_within_batch_limit(self, search_history, mock_firestore, monkeypatch):
+        """Test records kept by failed commits are retried in batches under 500 writes."""
+        monkeypatch.setattr(search_history_module, "WRITE_BATCH_SIZE", 10**6)  # Flush manually only
+        commit = mock_firestore.batch.return_value.commit
+        commit.side_effect = Exception("unavailable")
+        for i in range(300):
+            await search_history.record_search(f"kw {i}", "date", results_count=1)
+        await search_history.flush()
+        assert search_history._pending_count == 600
+
+        monkeypatch.setattr(search_history_module, "WRITE_BATCH_SIZE", 400)
+        batches = []
+
+        def new_batch():
+            batch = MagicMock()
+            batch.commit = AsyncMock()
+            batches.append(batch)
+            return batch
+
+        mock_firestore.batch.side_effect = new_batch
+        await search_history.flush()
+
+        assert [b.set.call_count for b in batches] == [400, 200]
+        assert all(b.set.call_count < 500 for b in batches)
+        assert search_history._pending_count == 0
+
+    async def test_failed_retries_drop_oldest_past_cap(self, search_history, mock_firestore, monkeypatch):
+        """Test a long outage drops the oldest searches instead of growing without bound."""
+        monkeypatch.setattr(search_history_module, "MAX_PENDING_WRITES", 6)
+        mock_firestore.batch.return_value.commit.side_effect = Exception("unavailable")
+
+        for i in range(5):
+            await search_history.record_search(f"kw {i}", "date", results_count=1)
+            await search_history.flush()
+
+        assert search_history._pending_count == 6
+        assert list(search_history._pending_writes) == [("kw 2", "date"), ("kw 3", "date"), ("kw 4", "date")]
+
+
+class TestShouldSearch:
+    """Tests for should_search method."""
+
+    async def test_first_search_is_all_time(self, search_history):
+        """Test a never-searched keyword gets an all-time search."""
+        _stream_docs(search_history, [])
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert time_window is None
+
+    async def test_cold_keyword_rechecked_from_cache(self, search_history):
+        """Test a cached empty history answers without any Firestore reads."""
+        _stream_docs(search_history, [])
+        await search_history.should_search("ai movie", "date")
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert (should_search, time_window) == (True, None)
+        assert _recent_query(search_history).stream.call_count == 1
+        assert _all_time_probe(search_history).get.await_count == 1
+
+    async def test_time_window_after_all_time_search(self, search_history):
+        """Test a keyword with an all-time search gets a time window."""
+        _stream_docs(
+            search_history,
+            [{"results_count": 50, "time_window": None, "searched_at": datetime.now(UTC)}],
+        )
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert set(time_window) == {"published_after", "published_before"}
+
+    async def test_all_time_due_from_search_state(self, search_history):
+        """Test a stale all-time search is repeated without reading history."""
+        _set_state(
+            search_history,
+            {"last_all_time_at": datetime.now(UTC) - timedelta(days=8)},
+        )
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert time_window is None
+        _recent_query(search_history).stream.assert_not_called()
+
+    async def test_recent_all_time_in_search_state_uses_window(self, search_history):
+        """Test a recent all-time search leads to a time window."""
+        now = datetime.now(UTC)
+        _set_state(search_history, {"last_all_time_at": now - timedelta(days=1)})
+        _stream_docs(
+            search_history,
+            [{"results_count": 50, "time_window": None, "searched_at": now - timedelta(days=1)}],
+        )
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert time_window is not None
+
+    async def test_state_without_all_time_stamp_checks_history(self, search_history):
+        """Test a state doc lacking last_all_time_at defers to the all-time history probe."""
+        now = datetime.now(UTC)
+        _set_state(search_history, {"last_searched_at": now - timedelta(days=1), "avg_results_per_day": 2.0})
+        _stream_docs(
+            search_history,
+            [{"results_count": 50, "time_window": None, "searched_at": now - timedelta(days=2)}],
+        )
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert time_window is not None
+        assert _all_time_probe(search_history).get.await_count == 1
+
+    async def test_record_search_updates_search_state(self, search_history, mock_firestore):
+        """Test all-time searches stamp last_all_time_at on the search state doc."""
+        window = {"published_after": "2025-01-01T00:00:00Z", "published_before": "2025-01-31T23:59:59Z"}
+        await search_history.record_search("ai movie", "date", results_count=5)
+        await search_history.record_search("ai movie", "date", results_count=5, time_window=window)
+        await search_history.flush()
+
+        state_writes = [
+            c for c in mock_firestore.batch.return_value.set.call_args_list
+            if c[0][0] is search_history.state_collection.document.return_value
+        ]
+        assert len(state_writes) == 2
+        assert "last_all_time_at" in state_writes[0][0][1]
+        assert "last_all_time_at" not in state_writes[1][0][1]
+        search_history.state_collection.document.assert_called_with(
+            SearchHistory._state_doc_id("ai movie", "date")
+        )
+
+    async def test_keyword_with_slash_maps_to_single_state_doc(self, search_history, mock_firestore):
+        """Test keywords containing "/" get a valid, stable one-segment state doc ID."""
+        doc_id = SearchHistory._state_doc_id("AC/DC tribute", "date")
+
+        assert "/" not in doc_id
+        assert doc_id == SearchHistory._state_doc_id("AC/DC tribute", "date")
+        assert doc_id != SearchHistory._state_doc_id("AC/DC tribute", "viewCount")
+        client = AsyncClient(project="test", credentials=AnonymousCredentials())
+        client.collection("search_state").document(doc_id)  # Raises on an invalid path
+
+        _stream_docs(search_history, [])
+        await search_history.should_search("AC/DC tribute", "date")
+        search_history.state_collection.document.assert_called_with(doc_id)
+
+        await search_history.record_search("AC/DC tribute", "date", results_count=3)
+        await search_history.flush()
+        state_write = next(
+            c for c in mock_firestore.batch.return_value.set.call_args_list
+            if c[0][0] is search_history.state_collection.document.return_value
+        )
+        assert state_write[0][1]["keyword"] == "AC/DC tribute"
+        assert state_write[0][1]["order"] == "date"
+
+    async def test_window_from_search_state_skips_history(self, search_history):
+        """Test the upload rate on the state doc is used without reading history."""
+        now = datetime.now(UTC)
+        _set_state(
+            search_history,
+            {
+                "last_all_time_at": now - timedelta(days=1),
+                "last_searched_at": now - timedelta(days=1),
+                "avg_results_per_day": 2.0,
+            },
+        )
+
+        should_search, time_window = await search_history.should_search("ai movie", "date")
+
+        assert should_search is True
+        assert time_window is not None
+        _recent_query(search_history).stream.assert_not_called()
+
+
+class TestUploadRate:
+    """Tests for the running upload-rate average."""
+
+    async def test_first_search_seeds_average(self, search_history, mock_firestore):
+        """Test the first counted search sets the average to its own rate."""
+        window = {"published_after": "2025-01-01T00:00:00Z", "published_before": "2025-01-11T23:59:59Z"}
+
+        await search_history.record_search("ai movie", "date", results_count=50, time_window=window)
+
+        state = search_history._state_cache[("ai movie", "date")][1]
+        assert state["avg_results_per_day"] == pytest.approx(5.0)
+
+    async def test_average_is_smoothed(self, search_history):
+        """Test later searches move the average by the smoothing weight."""
+        _set_state(search_history, {"avg_results_per_day": 5.0})
+        window = {"published_after": "2025-01-01T00:00:00Z", "published_before": "2025-01-11T23:59:59Z"}
+
+        await search_history.record_search("ai movie", "date", results_count=10, time_window=window)
+
+        state = search_history._state_cache[("ai movie", "date")][1]
+        assert state["avg_results_per_day"] == pytest.approx(0.7 * 5.0 + 0.3 * 1.0)
+
+    async def test_empty_all_time_search_not_counted(self, search_history):
+        """Test an all-time search with no results leaves the average alone."""
+        _set_state(search_history, {"avg_results_per_day": 5.0})
+
+        await search_history.record_search("ai movie", "date", results_count=0)
+
+        state = search_history._state_cache[("ai movie", "date")][1]
+        assert state["avg_results_per_day"] == 5.0
+
+    async def test_recorded_window_has_epoch_bounds(self, search_history, mock_firestore):
+        """Test recorded time windows carry epoch bounds used by the estimate."""
+        window = {"published_after": "2025-01-01T00:00:00Z", "published_before": "2025-01-11T23:59:59Z"}
+
+        await search_history.record_search("ai movie", "date", results_count=50, time_window=window)
+        await search_history.flush()
+
+        saved = mock_firestore.batch.return_value.set.call_args_list[0][0][1]["time_window"]
+        assert saved["after_ts"] == int(datetime(2025, 1, 1, tzinfo=UTC).timestamp())
+        assert saved["before_ts"] == int(datetime(2025, 1, 11, 23, 59, 59, tzinfo=UTC).timestamp())
+        assert SearchHistory._search_days(50, saved) == SearchHistory._search_days(50, window) == 10
+        assert "after_ts" not in window  # Caller's dict is left untouched
+
+
+class TestGenerateTimeWindow:
+    """Tests for _generate_time_window method."""
+
+    def test_window_bounds_match_chosen_span(self, search_history, monkeypatch):
+        """Test the window ends days_back days ago and spans window_days days."""
+        now = datetime(2025, 6, 15, 12, 0, tzinfo=UTC)
+        monkeypatch.setattr(search_history_module.random, "choice", lambda options: options[0])
+        monkeypatch.setattr(search_history_module.random, "choices", lambda buckets, weights: ["archive"])
+        monkeypatch.setattr(search_history_module.random, "randint", lambda low, high: low)
+
+        window = search_history._generate_time_window("ai movie", "date", 10.0, None, now=now)
+
+        # High frequency -> 7 day window; archive -> 365 days back
+        assert window == {
+            "published_after": "2024-06-08T00:00:00Z",
+            "published_before": "2024-06-15T23:59:59Z",
+        }
+
+    def test_viral_bucket_skipped_for_slow_keywords(self, search_history, monkeypatch):
+        """Test keywords too slow for viral tracking never pick that bucket."""
+        picked = []
+
+        def choices(buckets, weights):
+            picked.append(dict(zip(buckets, weights)))
+            return ["recent"]
+
+        monkeypatch.setattr(search_history_module.random, "choices", choices)
+
+        search_history._generate_time_window("ai movie", "date", 0.05, None)
+        search_history._generate_time_window("ai movie", "date", 10.0, None)
+
+        assert picked[0] == {"viral": 0.0, "recent": 0.80, "archive": 0.20}
+        assert picked[1] == {"viral": 0.50, "recent": 0.30, "archive": 0.20}
+
+    def test_since_last_search_uses_epoch(self, search_history, monkeypatch):
+        """Test a recent, busy keyword searches the days since its last search."""
+        now = datetime(2025, 6, 15, 12, 0, tzinfo=UTC)
+        last_searched = (now - timedelta(days=3)).timestamp()
+        monkeypatch.setattr(search_history_module.random, "randint", lambda low, high: high)
+
+        window = search_history._generate_time_window("ai movie", "date", 10.0, last_searched, now=now)
+
+        # 10 videos/day * 3 days >= 15 new -> window of at most 4 days, ending <= 3 days ago
+        assert window["published_before"] == "2025-06-12T23:59:59Z"
+        assert window["published_after"] == "2025-06-08T00:00:00Z"
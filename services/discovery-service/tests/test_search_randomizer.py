@@ -0,0 +1,274 @@
+"""Tests for SearchRandomizer."""
+
+import random
+import threading
+from collections import Counter
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import search_randomizer
+from app.core.search_randomizer import RFC3339_FORMAT, SearchRandomizer, TimeWindow
+
+
+def _doc(data: dict) -> MagicMock:
+    """Build a mock Firestore document snapshot."""
+    doc = MagicMock()
+    doc.to_dict.return_value = data
+    return doc
+
+
+def _keyword_searches(collection: MagicMock, records: list[dict]) -> MagicMock:
+    """Serve records (newest first) from the ordered, paged keyword_searches scan."""
+    page = collection.select.return_value.order_by.return_value.limit.return_value
+    page.stream.side_effect = lambda: iter([_doc(record) for record in records])
+    return page
+
+
+@pytest.fixture(autouse=True)
+def clear_collection_cache():
+    """Each test starts with an empty shared collection cache."""
+    search_randomizer._collection_cache.clear()
+    yield
+    search_randomizer._collection_cache.clear()
+
+
+@pytest.fixture
+def mock_firestore():
+    """Firestore client with one mock per collection."""
+    client = MagicMock()
+    collections = {
+        "ip_configs": MagicMock(),
+        "keyword_searches": MagicMock(),
+    }
+    collections["ip_configs"].select.return_value.stream.side_effect = lambda: iter([
+        _doc({"name": "Superman", "search_keywords": ["superman ai", "superman sora"]}),
+        _doc({"name": "Old", "deleted": True, "search_keywords": ["old keyword"]}),
+    ])
+    _keyword_searches(collections["keyword_searches"], [
+        {"keyword": "superman ai", "tier": 1, "searched_at": datetime(2025, 3, 2, tzinfo=UTC)},
+        {"keyword": "superman ai", "tier": 3, "searched_at": datetime(2025, 2, 1, tzinfo=UTC)},
+    ])
+    client.collection.side_effect = lambda name: collections[name]
+    client.collections = collections
+    return client
+
+
+class TestCollectionCache:
+    """Tests for the shared Firestore collection cache."""
+
+    def test_loads_keywords_from_active_configs(self, mock_firestore):
+        """Test deleted configs are skipped when loading keywords."""
+        randomizer = SearchRandomizer(firestore_client=mock_firestore)
+
+        assert randomizer.keywords == ["superman ai", "superman sora"]
+        mock_firestore.collections["ip_configs"].select.assert_called_once_with(
+            ["name", "search_keywords", "deleted"]
+        )
+
+    def test_new_instances_reuse_cached_configs(self, mock_firestore):
+        """Test a second randomizer within the TTL does not re-read ip_configs."""
+        SearchRandomizer(firestore_client=mock_firestore)
+        SearchRandomizer(firestore_client=mock_firestore)
+
+        assert mock_firestore.collections["ip_configs"].select.return_value.stream.call_count == 1
+
+    def test_keyword_searches_read_once_per_ttl(self, mock_firestore):
+        """Test tier lookup and prioritization share one keyword_searches read."""
+        randomizer = SearchRandomizer(firestore_client=mock_firestore)
+
+        by_tier = randomizer._get_keywords_by_tier()
+        randomizer._prioritize_keywords(max_keywords=2)
+
+        assert by_tier[1] == ["superman ai"]
+        assert by_tier[3] == ["superman sora"]
+        page = (
+            mock_firestore.collections["keyword_searches"]
+            .select.return_value.order_by.return_value.limit.return_value
+        )
+        assert page.stream.call_count == 1
+
+    def test_keyword_stats_keep_latest_record(self, mock_firestore):
+        """Test the newest-first scan keeps each keyword's latest tier and search time."""
+        randomizer = SearchRandomizer(firestore_client=mock_firestore)
+
+        stats = randomizer._load_keyword_stats()
+
+        assert stats == {
+            "superman ai": {"tier": 1, "last_searched": datetime(2025, 3, 2, tzinfo=UTC)},
+        }
+        keyword_searches = mock_firestore.collections["keyword_searches"]
+        keyword_searches.select.assert_called_once_with(["keyword", "tier", "searched_at"])
+        keyword_searches.select.return_value.order_by.assert_called_once_with(
+            "searched_at", direction="DESCENDING"
+        )
+
+    def test_expired_entries_are_refetched(self, mock_firestore):
+        """Test reads after the TTL go back to Firestore."""
+        with patch.object(search_randomizer.time, "monotonic", return_value=1000.0):
+            SearchRandomizer(firestore_client=mock_firestore)
+
+        expired = 1000.0 + search_randomizer.COLLECTION_CACHE_TTL_SECONDS
+        with patch.object(search_randomizer.time, "monotonic", return_value=expired):
+            SearchRandomizer(firestore_client=mock_firestore)
+
+        assert mock_firestore.collections["ip_configs"].select.return_value.stream.call_count == 2
+
+
+class TestTimeWindow:
+    """Tests for TimeWindow bounds."""
+
+    def test_bounds_share_reference_time(self):
+        """Test both bounds are computed from the given now."""
+        now = datetime(2025, 3, 31, 12, 30, 15, 250000, tzinfo=UTC)
+        window = TimeWindow(name="last_30_days", days_ago_start=30, days_ago_end=0)
+
+        assert window.get_published_after(now) == "2025-03-01T12:30:15.250000Z"
+        assert window.get_published_before(now) == "2025-03-31T12:30:15.250000Z"
+
+    def test_search_params_for_index_use_injected_now(self):
+        """Test get_search_params_for_index derives bounds from the injected now."""
+        now = datetime(2025, 1, 10, tzinfo=UTC)
+        randomizer = SearchRandomizer(keywords=["superman ai"])
+
+        params = randomizer.get_search_params_for_index(0, pages_per_keyword=1, now=now)
+
+        window = randomizer.time_windows[(10 // len(randomizer.orders)) % len(randomizer.time_windows)]
+        assert params.published_before == now.strftime(RFC3339_FORMAT)
+        assert params.published_after == window.get_published_after(now)
+        assert params.order == randomizer.orders[10 % len(randomizer.orders)]
+
+
+class TestPrioritizeKeywords:
+    """Tests for keyword prioritization."""
+
+    def test_orders_by_tier_then_never_searched_then_oldest(self):
+        """Test selection prefers low tiers, then never-searched, then oldest searches."""
+        client = MagicMock()
+        _keyword_searches(client.collection.return_value, [
+            {"keyword": "t1 recent", "tier": 1, "searched_at": datetime(2025, 3, 2, tzinfo=UTC)},
+            {"keyword": "t1 old", "tier": "1", "searched_at": datetime(2025, 1, 1, tzinfo=UTC)},
+            {"keyword": "t2 old", "tier": 2, "searched_at": datetime(2024, 1, 1, tzinfo=UTC)},
+        ])
+        randomizer = SearchRandomizer(
+            keywords=["t2 old", "never a", "t1 recent", "never b", "t1 old"],
+            firestore_client=client,
+        )
+
+        selected = randomizer._prioritize_keywords(max_keywords=4)
+
+        assert selected == ["t1 old", "t1 recent", "t2 old", "never a"]
+
+
+class TestDailySearchPlan:
+    """Tests for randomized keyword plan generation."""
+
+    @pytest.fixture
+    def randomizer(self):
+        """Randomizer with a fixed tier split and no channel scans."""
+        randomizer = SearchRandomizer(keywords=["placeholder"])
+        randomizer.firestore = MagicMock()
+        randomizer._get_channels_to_scan = MagicMock(return_value=[])
+        randomizer._get_keywords_by_tier = MagicMock(return_value={
+            1: [f"t1-{i}" for i in range(10)],
+            2: [f"t2-{i}" for i in range(10)],
+            3: [f"t3-{i}" for i in range(10)],
+        })
+        return randomizer
+
+    def test_combinations_are_unique(self, randomizer):
+        """Test no keyword+order combination is planned twice."""
+        plan = randomizer.get_daily_search_plan(max_quota=5_000)
+
+        combos = [(p.query, p.order) for p in plan]
+        assert len(combos) == 50
+        assert len(set(combos)) == 50
+
+    def test_plan_stops_when_combinations_run_out(self, randomizer):
+        """Test a quota larger than the combination space yields every combination once."""
+        plan = randomizer.get_daily_search_plan(max_quota=100_000)
+
+        assert len(plan) == 30 * len(randomizer.orders)
+        assert len({(p.query, p.order) for p in plan}) == len(plan)
+
+    def test_channel_and_keyword_reads_run_concurrently(self, randomizer):
+        """Test channel and tier loading overlap instead of running back to back."""
+        barrier = threading.Barrier(2, timeout=5)
+        by_tier = randomizer._get_keywords_by_tier.return_value
+
+        def wait_then(result):
+            def side_effect(*args, **kwargs):
+                barrier.wait()  # Raises BrokenBarrierError if the other read never starts
+                return result
+            return side_effect
+
+        randomizer._get_channels_to_scan.side_effect = wait_then([{"channel_id": "UC_a", "video_count": 3}])
+        randomizer._get_keywords_by_tier.side_effect = wait_then(by_tier)
+
+        plan = randomizer.get_daily_search_plan(max_quota=1_002)
+
+        assert sum(p.query == "CHANNEL:UC_a" for p in plan) == 1
+        assert len(plan) == 1 + 10
+
+    def test_tier_weighting_is_preserved(self, randomizer):
+        """Test higher tiers take a larger share of a small plan."""
+        random.seed(1234)
+        counts = Counter()
+        for _ in range(200):
+            plan = randomizer.get_daily_search_plan(max_quota=1_000)
+            counts.update(p.query[:2] for p in plan)
+
+        total = sum(counts.values())
+        assert counts["t1"] / total == pytest.approx(0.50, abs=0.05)
+        assert counts["t2"] / total == pytest.approx(0.35, abs=0.05)
+        assert counts["t3"] / total == pytest.approx(0.15, abs=0.05)
+
+
+class TestChannelsToScan:
+    """Tests for channel scan selection."""
+
+    def test_skips_channels_in_cooldown(self):
+        """Test channels with a future next_scan_due_at are skipped, using projected reads."""
+        client = MagicMock()
+        channels, channel_scans = MagicMock(), MagicMock()
+        client.collection.side_effect = lambda name: {
+            "channels": channels, "channel_scans": channel_scans,
+        }[name]
+        ranked = channels.select.return_value.order_by.return_value.limit.return_value
+        ranked.stream.return_value = iter([
+            _doc({"channel_id": "UC_busy", "video_count": 40}),
+            _doc({"channel_id": "UC_cooling", "video_count": 30}),
+            _doc({"channel_id": "UC_quiet", "video_count": 5}),
+        ])
+        cooling = MagicMock()
+        cooling.get.return_value = "UC_cooling"
+        channel_scans.select.return_value.where.return_value.stream.return_value = iter([cooling])
+        randomizer = SearchRandomizer(keywords=["placeholder"], firestore_client=client)
+
+        selected = randomizer._get_channels_to_scan(max_channels=5)
+
+        assert [ch["channel_id"] for ch in selected] == ["UC_busy", "UC_quiet"]
+        channels.select.assert_called_once_with(["channel_id", "video_count"])
+        channel_scans.select.assert_called_once_with(["channel_id"])
+
+    def test_retry_reuses_ranking_but_rechecks_cooldowns(self):
+        """Test a second plan within the TTL skips the ranking query but not the cooldown query."""
+        client = MagicMock()
+        channels, channel_scans = MagicMock(), MagicMock()
+        client.collection.side_effect = lambda name: {
+            "channels": channels, "channel_scans": channel_scans,
+        }[name]
+        ranked = channels.select.return_value.order_by.return_value.limit.return_value
+        ranked.stream.side_effect = lambda: iter([_doc({"channel_id": "UC_busy", "video_count": 40})])
+        cooldowns = channel_scans.select.return_value.where.return_value
+        cooldowns.stream.side_effect = [iter([]), iter([MagicMock(**{"get.return_value": "UC_busy"})])]
+        randomizer = SearchRandomizer(keywords=["placeholder"], firestore_client=client)
+
+        first = randomizer._get_channels_to_scan(max_channels=5)
+        second = randomizer._get_channels_to_scan(max_channels=5)
+
+        assert [ch["channel_id"] for ch in first] == ["UC_busy"]
+        assert second == []
+        assert ranked.stream.call_count == 1
+        assert cooldowns.stream.call_count == 2
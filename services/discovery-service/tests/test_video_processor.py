@@ -1,9 +1,12 @@
 """Tests for VideoProcessor class."""
 
+import threading
+
 import pytest
 from datetime import datetime, timedelta, UTC
 from unittest.mock import MagicMock
 
+from app.core import video_processor as video_processor_module
 from app.core.video_processor import VideoProcessor
 from app.models import VideoMetadata, VideoStatus
 
@@ -90,6 +93,24 @@ def video_processor(mock_firestore, mock_pubsub, mock_ip_manager):
     )
 
 
+@pytest.fixture(autouse=True)
+def clear_module_caches():
+    """Each test starts with an empty channel risk cache."""
+    video_processor_module._channel_risk_cache.clear()
+    yield
+    video_processor_module._channel_risk_cache.clear()
+
+
+@pytest.fixture
+def processor(mock_firestore, mock_pubsub):
+    """Video processor built with the current constructor (no IP manager)."""
+    return VideoProcessor(
+        firestore_client=mock_firestore,
+        pubsub_publisher=mock_pubsub,
+        topic_path="projects/test-project/topics/test-topic",
+    )
+
+
 class TestVideoProcessorInit:
     """Tests for VideoProcessor initialization."""
 
@@ -289,6 +310,382 @@ class TestParseDuration:
         assert video_processor._parse_duration("PT") == 0
 
 
+class TestPublishedAtParsing:
+    """Tests for parsing publishedAt without string rewriting."""
+
+    def test_z_suffix_parsed_as_utc(self, processor, sample_video_data):
+        """Test the YouTube "Z" timestamp is parsed directly as an aware UTC datetime."""
+        metadata = processor.extract_metadata(sample_video_data)
+
+        assert metadata.published_at == datetime(2024, 1, 15, 10, 30, tzinfo=UTC)
+
+    def test_non_string_falls_back_to_now(self, processor, sample_video_data):
+        """Test a missing/null publishedAt still falls back to the current time."""
+        sample_video_data["snippet"]["publishedAt"] = None
+
+        metadata = processor.extract_metadata(sample_video_data)
+
+        assert datetime.now(UTC) - metadata.published_at < timedelta(minutes=1)
+
+
+class TestThumbnailSelection:
+    """Tests for picking the best available thumbnail."""
+
+    def test_falls_back_to_next_quality_with_a_url(self, processor, sample_video_data):
+        """Test missing or URL-less sizes are skipped in high/medium/default order."""
+        sample_video_data["snippet"]["thumbnails"] = {
+            "high": {"width": 480},
+            "default": {"url": "https://i.ytimg.com/default.jpg"},
+        }
+
+        assert processor.extract_metadata(sample_video_data).thumbnail_url == "https://i.ytimg.com/default.jpg"
+
+    def test_no_thumbnails(self, processor, sample_video_data):
+        """Test videos without thumbnails get an empty URL."""
+        del sample_video_data["snippet"]["thumbnails"]
+
+        assert processor.extract_metadata(sample_video_data).thumbnail_url == ""
+
+
+class TestParseDurationSinglePass:
+    """Tests for the single-pass duration parser."""
+
+    def test_parses_all_units(self, processor):
+        """Test hours, minutes and seconds are combined in any subset."""
+        assert processor._parse_duration("PT1H30M45S") == 5445
+        assert processor._parse_duration("PT10M") == 600
+        assert processor._parse_duration("PT0S") == 0
+        assert processor._parse_duration("PT") == 0
+
+    def test_rejects_unexpected_characters(self, processor):
+        """Test strings without the PT prefix or with unknown units return 0."""
+        assert processor._parse_duration("P1D") == 0
+        assert processor._parse_duration("PT1.5S") == 0
+        assert processor._parse_duration("") == 0
+
+
+def _search_result(video_id: str, channel_id: str, views: int) -> dict:
+    """Minimal videos.list item for batch processing tests."""
+    return {
+        "id": video_id,
+        "snippet": {
+            "title": f"Video {video_id}",
+            "channelId": channel_id,
+            "channelTitle": f"Channel {channel_id}",
+            "publishedAt": "2024-01-15T10:30:00Z",
+        },
+        "statistics": {"viewCount": str(views)},
+        "contentDetails": {"duration": "PT1M"},
+    }
+
+
+class TestBatchedWrites:
+    """Tests for batching new-video writes in process_batch."""
+
+    @pytest.fixture
+    def new_videos(self, mock_firestore):
+        """Three unseen videos, two from the same channel."""
+        mock_firestore.get_all.side_effect = lambda refs: [
+            MagicMock(id=video_id, exists=False) for video_id in ("vid_a", "vid_b", "vid_c")
+        ]
+        return [
+            _search_result("vid_a", "UC_one", 100),
+            _search_result("vid_b", "UC_one", 50),
+            _search_result("vid_c", "UC_two", 10),
+        ]
+
+    def test_batch_commits_once(self, processor, mock_firestore, mock_pubsub, new_videos):
+        """Test all new videos and their stats go out in a single batch commit."""
+        processed = processor.process_batch(new_videos)
+
+        batch = mock_firestore.batch.return_value
+        assert [m.video_id for m in processed] == ["vid_a", "vid_b", "vid_c"]
+        mock_firestore.batch.assert_called_once()
+        batch.commit.assert_called_once()
+        # 3 video docs + 1 hourly + 2 channels + 1 global
+        assert batch.set.call_count == 7
+        assert mock_pubsub.publish.call_count == 3
+
+    def test_stats_are_coalesced_per_batch(self, processor, mock_firestore, new_videos):
+        """Test counters increment once by the batch size instead of once per video."""
+        processor.process_batch(new_videos)
+
+        merged = [c.args[1] for c in mock_firestore.batch.return_value.set.call_args_list if c.kwargs.get("merge")]
+        hourly, channel_one, channel_two, global_stats = merged
+        assert hourly["discoveries"].value == 3
+        assert channel_one["total_videos_found"].value == 2
+        assert channel_one["total_views"].value == 150
+        assert channel_two["total_videos_found"].value == 1
+        assert global_stats["total_videos"].value == 3
+
+    def test_published_message_is_model_json(self, processor, mock_pubsub, new_videos):
+        """Test published payloads are the model's JSON as UTF-8 bytes."""
+        processed = processor.process_batch(new_videos[:1])
+
+        message_data = mock_pubsub.publish.call_args.args[1]
+        assert isinstance(message_data, bytes)
+        assert message_data == processed[0].model_dump_json().encode("utf-8")
+
+    def test_failed_commit_skips_publish(self, processor, mock_firestore, mock_pubsub, new_videos):
+        """Test videos from a failed commit are not published or returned."""
+        mock_firestore.batch.return_value.commit.side_effect = Exception("unavailable")
+
+        processed = processor.process_batch(new_videos)
+
+        assert processed == []
+        mock_pubsub.publish.assert_not_called()
+
+
+class TestPrefetchExisting:
+    """Tests for the bulk existing-video lookup in process_batch."""
+
+    def test_existing_videos_read_in_one_call(self, processor, mock_firestore):
+        """Test one get_all replaces per-video reads and duplicates are updated, not saved."""
+        existing = MagicMock(id="vid_old", exists=True)
+        existing.to_dict.return_value = {"view_count": 100, "updated_at": datetime.now(UTC) - timedelta(hours=1)}
+        mock_firestore.get_all.side_effect = [[existing, MagicMock(id="vid_new", exists=False)], []]
+        videos = [_search_result("vid_old", "UC_one", 110), _search_result("vid_new", "UC_one", 5)]
+
+        videos_collection, other_collections = MagicMock(), MagicMock()
+        mock_firestore.collection.side_effect = (
+            lambda name: videos_collection if name == "videos" else other_collections
+        )
+
+        processed = processor.process_batch(videos)
+
+        assert len(mock_firestore.get_all.call_args_list[0].args[0]) == 2
+        videos_collection.document.return_value.get.assert_not_called()
+        videos_collection.document.return_value.update.assert_called_once()
+        assert [m.video_id for m in processed] == ["vid_new"]
+
+    def test_batch_shares_one_timestamp(self, processor, mock_firestore):
+        """Test updates to existing videos and new-video writes use the same batch time."""
+        existing = MagicMock(id="vid_old", exists=True)
+        existing.to_dict.return_value = {"view_count": 100, "updated_at": datetime.now(UTC) - timedelta(hours=1)}
+        mock_firestore.get_all.side_effect = [[existing, MagicMock(id="vid_new", exists=False)], []]
+        videos = [_search_result("vid_old", "UC_one", 110), _search_result("vid_new", "UC_one", 5)]
+
+        processor.process_batch(videos)
+
+        update = mock_firestore.collection.return_value.document.return_value.update.call_args.args[0]
+        video_doc = mock_firestore.batch.return_value.set.call_args_list[0].args[1]
+        assert update["updated_at"] == update["last_seen_at"] == video_doc["discovered_at"]
+
+    def test_existing_video_updates_run_concurrently(self, processor, mock_firestore):
+        """Test updates to different existing videos overlap instead of running one by one."""
+        snapshots = []
+        for video_id in ("vid_a", "vid_b"):
+            snapshot = MagicMock(id=video_id, exists=True)
+            snapshot.to_dict.return_value = {"view_count": 10, "updated_at": datetime.now(UTC)}
+            snapshots.append(snapshot)
+        mock_firestore.get_all.side_effect = [snapshots, []]
+        barrier = threading.Barrier(2, timeout=5)
+        update = mock_firestore.collection.return_value.document.return_value.update
+        update.side_effect = lambda data: barrier.wait()  # Breaks if the other update never starts
+
+        processor.process_batch([_search_result("vid_a", "UC_one", 10), _search_result("vid_b", "UC_one", 10)])
+
+        assert update.call_count == 2
+        assert not barrier.broken
+
+    def test_repeated_video_processed_once(self, processor, mock_firestore):
+        """Test a video listed twice in one batch is only looked up and saved once."""
+        mock_firestore.get_all.side_effect = lambda refs: [MagicMock(id="vid_a", exists=False)]
+        videos = [_search_result("vid_a", "UC_one", 1), _search_result("vid_a", "UC_one", 1)]
+
+        processed = processor.process_batch(videos)
+
+        assert len(mock_firestore.get_all.call_args.args[0]) == 1
+        assert [m.video_id for m in processed] == ["vid_a"]
+
+    def test_channel_risk_read_once_per_channel(self, processor, mock_firestore):
+        """Test new videos' channels are scored from one deduplicated get_all."""
+        serial_infringer = MagicMock(id="UC_one", exists=True)
+        serial_infringer.to_dict.return_value = {"infringing_videos_count": 12}
+        mock_firestore.get_all.side_effect = [
+            [MagicMock(id="vid_a", exists=False), MagicMock(id="vid_b", exists=False)],
+            [serial_infringer],
+        ]
+        videos = [_search_result("vid_a", "UC_one", 1), _search_result("vid_b", "UC_one", 1)]
+
+        processed = processor.process_batch(videos)
+
+        assert mock_firestore.get_all.call_count == 2
+        assert len(mock_firestore.get_all.call_args.args[0]) == 1
+        mock_firestore.collection.return_value.document.return_value.get.assert_not_called()
+        assert {m.initial_risk for m in processed} == {processor.calculate_initial_risk(processed[0], 80)}
+
+    def test_falls_back_to_single_reads_when_bulk_read_fails(self, processor, mock_firestore):
+        """Test a failed get_all falls back to reading each video on its own."""
+        mock_firestore.get_all.side_effect = Exception("unavailable")
+        doc = mock_firestore.collection.return_value.document.return_value
+        doc.get.return_value.exists = False
+
+        processed = processor.process_batch([_search_result("vid_a", "UC_one", 1)])
+
+        doc.get.assert_called()
+        assert [m.video_id for m in processed] == ["vid_a"]
+
+
+class TestChannelRiskCache:
+    """Tests for the in-process channel risk cache."""
+
+    def test_second_lookup_served_from_cache(self, processor, mock_firestore):
+        """Test a channel scored within the TTL is not read again."""
+        doc = mock_firestore.collection.return_value.document.return_value
+        doc.get.return_value.exists = False
+
+        assert processor._get_channel_risk("UC_one") == 40
+        assert processor._get_channel_risk("UC_one") == 40
+        assert processor._get_channel_risks(["UC_one"]) == {"UC_one": 40}
+
+        doc.get.assert_called_once()
+        mock_firestore.get_all.assert_not_called()
+
+    def test_expired_score_is_reread(self, processor, mock_firestore, monkeypatch):
+        """Test scores older than the TTL are fetched again."""
+        doc = mock_firestore.collection.return_value.document.return_value
+        doc.get.return_value.exists = False
+        monkeypatch.setattr(video_processor_module.time, "monotonic", lambda: 1000.0)
+        processor._get_channel_risk("UC_one")
+
+        expired = 1000.0 + video_processor_module._CHANNEL_RISK_TTL_SECONDS
+        monkeypatch.setattr(video_processor_module.time, "monotonic", lambda: expired)
+        processor._get_channel_risk("UC_one")
+
+        assert doc.get.call_count == 2
+
+    def test_oldest_score_evicted_at_capacity(self, processor, mock_firestore, monkeypatch):
+        """Test the cache stays bounded by evicting the oldest channel first."""
+        doc = mock_firestore.collection.return_value.document.return_value
+        doc.get.return_value.exists = False
+        monkeypatch.setattr(video_processor_module, "_CHANNEL_RISK_CACHE_MAX", 2)
+
+        for channel_id in ("UC_one", "UC_two", "UC_three"):
+            processor._get_channel_risk(channel_id)
+
+        assert list(video_processor_module._channel_risk_cache) == ["UC_two", "UC_three"]
+
+
+class TestMatchIPsPrelowered:
+    """Tests for matching against IP patterns lowercased at cache load."""
+
+    @pytest.fixture(autouse=True)
+    def ip_configs(self, mock_firestore, monkeypatch):
+        """Serve two IP configs from a cold cache."""
+        monkeypatch.setattr(video_processor_module, "_ip_configs_cache", None)
+        monkeypatch.setattr(video_processor_module, "_ip_configs_cache_time", None)
+        dc = MagicMock(id="dc-universe")
+        dc.to_dict.return_value = {"search_keywords": ["Superman AI"], "characters": ["Lex Luthor"]}
+        marvel = MagicMock(id="marvel")
+        marvel.to_dict.return_value = {"search_keywords": ["Iron Man"], "characters": []}
+        mock_firestore.collection.return_value.stream.return_value = iter([dc, marvel])
+
+    def test_cache_stores_lowercased_patterns(self, processor):
+        """Test patterns are lowercased once when the cache is filled."""
+        prefilter, patterns = processor._load_ip_configs_cached()
+
+        assert patterns == (
+            ("superman ai", "dc-universe"),
+            ("lex luthor", "dc-universe"),
+            ("iron man", "marvel"),
+        )
+        assert video_processor_module._ip_configs_cache == (prefilter, patterns)
+
+    def test_matches_keywords_and_characters_case_insensitively(self, processor, sample_video_data):
+        """Test keyword and character matches are found regardless of case."""
+        metadata = processor.extract_metadata(sample_video_data)
+        metadata.description = "Featuring LEX LUTHOR"
+
+        assert processor.match_ips(metadata) == ["dc-universe"]
+
+        metadata.title = "iron man vs lex luthor"
+        metadata.description = ""
+        assert processor.match_ips(metadata) == ["dc-universe", "marvel"]
+
+    def test_matches_patterns_in_tags(self, processor, sample_video_data):
+        """Test a pattern appearing only in a tag is matched."""
+        metadata = processor.extract_metadata(sample_video_data)
+        metadata.title = "Untitled"
+        metadata.description = ""
+        metadata.tags = ["fan film", "Iron Man"]
+
+        assert processor.match_ips(metadata) == ["marvel"]
+
+    def test_prefilter_skips_attribution_when_nothing_matches(self, processor, sample_video_data, monkeypatch):
+        """Test a video matching no pattern is rejected by the prefilter before the per-IP loop."""
+        prefilter, _ = processor._load_ip_configs_cached()
+        metadata = processor.extract_metadata(sample_video_data)
+        metadata.title = "Cooking pasta"
+        metadata.description = ""
+        metadata.tags = ["food"]
+        metadata.channel_title = "Chef"
+        patterns = MagicMock()
+        monkeypatch.setattr(video_processor_module, "_ip_configs_cache", (prefilter, patterns))
+
+        assert processor.match_ips(metadata) == []
+        patterns.__iter__.assert_not_called()
+
+    def test_prefilter_escapes_regex_characters(self, processor, sample_video_data, mock_firestore):
+        """Test patterns with regex metacharacters are matched literally."""
+        config = MagicMock(id="plus")
+        config.to_dict.return_value = {"search_keywords": ["C++ (AI)"]}
+        mock_firestore.collection.return_value.stream.return_value = iter([config])
+        metadata = processor.extract_metadata(sample_video_data)
+        metadata.title = "learning c++ (ai) today"
+
+        assert processor.match_ips(metadata) == ["plus"]
+
+
+class TestIpConfigsStaleWhileRevalidate:
+    """Tests for refreshing an expired IP configs cache in the background."""
+
+    def test_expired_cache_served_stale_then_refreshed(self, processor, mock_firestore, monkeypatch):
+        """Test an expired cache is returned at once and replaced by a background refresh."""
+        stale = (None, (("robin", "old"),))
+        monkeypatch.setattr(video_processor_module, "_ip_configs_cache", stale)
+        monkeypatch.setattr(
+            video_processor_module, "_ip_configs_cache_time", datetime.now(UTC) - timedelta(hours=1)
+        )
+        fresh = MagicMock(id="new")
+        fresh.to_dict.return_value = {"search_keywords": ["Batman"]}
+        release = threading.Event()
+
+        def slow_stream():
+            release.wait(timeout=5)
+            return iter([fresh])
+
+        mock_firestore.collection.return_value.stream.side_effect = slow_stream
+
+        assert processor._load_ip_configs_cached() is stale
+        assert processor._load_ip_configs_cached() is stale  # Refresh already running
+
+        release.set()
+        for thread in threading.enumerate():
+            if thread.name == "ip-configs-refresh":
+                thread.join(timeout=5)
+
+        assert mock_firestore.collection.return_value.stream.call_count == 1
+        assert processor._load_ip_configs_cached()[1] == (("batman", "new"),)
+
+
+class TestRiskTierLookup:
+    """Tests for the risk tier lookup table."""
+
+    def test_tier_boundaries(self, processor):
+        """Test each tier starts at its threshold."""
+        assert processor.calculate_risk_tier(19) == "VERY_LOW"
+        assert processor.calculate_risk_tier(20) == "LOW"
+        assert processor.calculate_risk_tier(40) == "MEDIUM"
+        assert processor.calculate_risk_tier(60) == "HIGH"
+        assert processor.calculate_risk_tier(80) == "CRITICAL"
+
+    def test_out_of_range_scores_are_clamped(self, processor):
+        """Test scores outside 0-100 map to the end tiers."""
+        assert processor.calculate_risk_tier(-5) == "VERY_LOW"
+        assert processor.calculate_risk_tier(150) == "CRITICAL"
+
+
 class TestIsDuplicate:
     """Tests for is_duplicate method."""
 
@@ -0,0 +1,34 @@
+"""Tests for YouTubeClient."""
+
+from unittest.mock import MagicMock, patch
+
+from app.core import youtube_client
+from app.core.youtube_client import YouTubeClient
+
+
+class TestServiceReuse:
+    """Tests for building the YouTube API service once per client."""
+
+    def test_service_built_once_across_calls(self):
+        """Test two API methods share one service built from the bundled discovery doc."""
+        service = MagicMock()
+        service.search.return_value.list.return_value.execute.return_value = {"items": [{"id": "a"}]}
+        service.videos.return_value.list.return_value.execute.return_value = {"items": [{"id": "b"}]}
+
+        with patch.object(youtube_client, "build", return_value=service) as build:
+            client = YouTubeClient(api_key="test-key")
+
+            assert client.search_videos(query="superman ai", max_results=1) == [{"id": "a"}]
+            assert client.get_trending_videos(max_results=1) == [{"id": "b"}]
+
+        build.assert_called_once_with(
+            "youtube", "v3", developerKey="test-key",
+            cache_discovery=False, static_discovery=True,
+        )
+
+    def test_service_not_built_until_first_call(self):
+        """Test constructing a client makes no build call."""
+        with patch.object(youtube_client, "build") as build:
+            YouTubeClient(api_key="test-key")
+
+        build.assert_not_called()